@@ -0,0 +1,83 @@
+# async_writer.py
+import os
+import queue
+import threading
+
+# Upper bound on how many queued writes the background thread handles per batch.
+MAX_BATCH_SIZE = 64
+
+
+class AsyncArtifactWriter:
+    """
+    Writes dataset artifacts on a single background thread so callers never
+    block on disk I/O. Queued writes are drained in batches; each output
+    directory is created once per batch and every file is written with a
+    single os.write() call.
+    Call flush_and_close() before exiting, or queued writes may be lost.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, name="artifact-writer", daemon=True)
+        self._errors = 0
+        self._thread.start()
+
+    def write(self, path, data, sync=False):
+        """
+        Queues `data` (str or bytes) to be written to `path`, replacing any existing file.
+        With sync=True the file is fsync'ed before the writer moves on.
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._queue.put((path, data, sync))
+
+    def flush_and_close(self):
+        """Waits for every queued write to finish and stops the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+        if self._errors:
+            print(f"{self._errors} artifact(s) could not be written.")
+
+    def _drain(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < MAX_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            by_dir = {}
+            for item in batch:
+                if item is not None:
+                    by_dir.setdefault(os.path.dirname(item[0]), []).append(item)
+
+            for directory, items in by_dir.items():
+                try:
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                except OSError as e:
+                    print(f"Could not create directory '{directory}': {e}")
+                    self._errors += len(items)
+                    continue
+                for path, data, sync in items:
+                    self._write_file(path, data, sync)
+
+            if stop:
+                return
+
+    def _write_file(self, path, data, sync):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                if sync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"Could not write '{path}': {e}")
+            self._errors += 1
@@ -0,0 +1,177 @@
+# gemini_client.py
+import os
+import re
+import asyncio
+import shutil
+import hashlib
+import weakref
+import google.generativeai as genai
+from aiolimiter import AsyncLimiter
+from config import GEMINI_API_KEY, GEMINI_MODEL_NAME
+
+# Maximum number of Gemini requests in flight at the same time.
+MAX_CONCURRENT_REQUESTS = 8
+# Size this to the requests-per-minute quota of GEMINI_MODEL_NAME to avoid 429s.
+REQUESTS_PER_MINUTE = 60
+
+# Responses are cached on disk, keyed by model + prompt, so reruns over unchanged
+# inputs skip the API call entirely.
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+_cache_enabled = True
+
+# asyncio primitives are tied to the event loop that first uses them, so each
+# loop (e.g. one per asyncio.run() call) gets its own semaphore and limiter.
+_gates = weakref.WeakKeyDictionary()
+# The configured model, shared by every call on the same event loop so the
+# client and its connection are set up once instead of per request.
+_models = weakref.WeakKeyDictionary()
+
+
+def _get_gates():
+    """Returns the (semaphore, rate limiter) pair for the running event loop."""
+    loop = asyncio.get_running_loop()
+    gates = _gates.get(loop)
+    if gates is None:
+        gates = (asyncio.Semaphore(MAX_CONCURRENT_REQUESTS), AsyncLimiter(REQUESTS_PER_MINUTE, 60))
+        _gates[loop] = gates
+    return gates
+
+
+def get_model():
+    """
+    Returns the GenerativeModel for GEMINI_MODEL_NAME, configuring the API the
+    first time it is needed on the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    model = _models.get(loop)
+    if model is None:
+        # genai.configure() drops the SDK's cached clients, so a new event loop
+        # never reuses an async channel bound to a loop that has since closed.
+        genai.configure(api_key=GEMINI_API_KEY)
+        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+        _models[loop] = model
+    return model
+
+
+class FenceStripper:
+    """
+    File-like wrapper that forwards a streamed model response to `sink`,
+    dropping the surrounding markdown code fence (```json, ```xml, ...) and
+    leading/trailing whitespace as the chunks arrive.
+    """
+
+    # Characters that may belong to a closing fence; held back until more text follows.
+    _TRAILING = "` \t\r\n"
+
+    def __init__(self, sink):
+        self._sink = sink
+        self._head = ""
+        self._held = ""
+        self._started = False
+
+    def write(self, text):
+        if not self._started:
+            self._head += text
+            body = self._head.lstrip()
+            if body.startswith("```"):
+                newline = body.find("\n")
+                if newline == -1:
+                    return  # the opening fence line is not complete yet
+                body = body[newline + 1:].lstrip()
+                self._head = body
+            if not body or "```".startswith(body):
+                return  # could still be the start of a fence
+            self._started = True
+            text = body
+
+        text = self._held + text
+        kept = text.rstrip(self._TRAILING)
+        self._held = text[len(kept):]
+        if kept:
+            self._sink.write(kept)
+
+    def close(self):
+        """Flushes anything still pending. A held-back closing fence is dropped."""
+        if not self._started:
+            body = re.sub(r"^```[\w-]*|```$", "", self._head.strip()).strip()
+            if body:
+                self._sink.write(body)
+        self._held = ""
+
+
+async def stream_content(model, prompt, sink):
+    """
+    Streams a Gemini response into `sink` (anything with a write() method)
+    chunk by chunk, with code fences removed. `prompt` is a string or a list
+    of text parts.
+    Calls are bounded by MAX_CONCURRENT_REQUESTS and REQUESTS_PER_MINUTE.
+    """
+    semaphore, limiter = _get_gates()
+    async with semaphore:
+        async with limiter:
+            response = await model.generate_content_async(prompt, stream=True)
+            writer = FenceStripper(sink)
+            async for chunk in response:
+                writer.write(chunk.text)
+            writer.close()
+
+
+def set_cache_enabled(enabled):
+    """Turns the on-disk response cache on or off (e.g. for a --no-cache flag)."""
+    global _cache_enabled
+    _cache_enabled = enabled
+
+
+def _cache_path(prompt, extension):
+    # A prompt given as a list of parts hashes the same as the joined string,
+    # without building that string.
+    digest = hashlib.sha256(f"{GEMINI_MODEL_NAME}\n".encode("utf-8"))
+    for part in ([prompt] if isinstance(prompt, str) else prompt):
+        digest.update(part.encode("utf-8"))
+    return os.path.join(CACHE_DIR, f"{digest.hexdigest()}.{extension}")
+
+
+def read_cache(prompt, extension, binary=False):
+    """
+    Returns the cached response for this prompt (string or parts list), or None on a miss.
+    With binary=True the raw UTF-8 bytes are returned without decoding them.
+    """
+    if not _cache_enabled:
+        return None
+    try:
+        if binary:
+            with open(_cache_path(prompt, extension), 'rb') as f:
+                return f.read()
+        with open(_cache_path(prompt, extension), 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_cache(prompt, extension, content):
+    """Stores a response for this prompt. The file is replaced atomically."""
+    if not _cache_enabled:
+        return
+    path = _cache_path(prompt, extension)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write Gemini cache entry {path}: {e}")
+
+
+def write_cache_from_file(prompt, extension, source_path):
+    """Like write_cache(), but copies an already written response file."""
+    if not _cache_enabled:
+        return
+    path = _cache_path(prompt, extension)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write Gemini cache entry {path}: {e}")
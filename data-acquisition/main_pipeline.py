@@ -1,19 +1,29 @@
 # main_pipeline.py
 import os
 import shutil
-import time
-from scraper import get_terraform_repos
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from scraper import iter_terraform_repos
 from processor import process_repository_readme
-from validator import validate_terraform_code
+from validator import validate_terraform_code, TF_PLUGIN_CACHE_DIR
+from gemini_client import set_cache_enabled, MAX_CONCURRENT_REQUESTS
+from async_writer import AsyncArtifactWriter
 
 from config import TEMP_DIR, DATASET_DIR, MAX_REPOS_TO_SCRAPE
 
+# `terraform init` + `validate` runs are independent, so several repos are validated at once.
+MAX_VALIDATION_WORKERS = min(8, os.cpu_count() or 1)
+# Bounded so a fast stage can't run arbitrarily far ahead of a slower one.
+STAGE_QUEUE_SIZE = 16
+
 
 def setup_directories():
     """Create necessary directories for the pipeline."""
     os.makedirs(TEMP_DIR, exist_ok=True)
     os.makedirs(DATASET_DIR, exist_ok=True)
-    print(f"Directories '{TEMP_DIR}' and '{DATASET_DIR}' are ready.")
+    os.makedirs(TF_PLUGIN_CACHE_DIR, exist_ok=True)
+    print(f"Directories '{TEMP_DIR}', '{DATASET_DIR}' and '{TF_PLUGIN_CACHE_DIR}' are ready.")
 
 
 def cleanup():
@@ -23,75 +33,199 @@ def cleanup():
         print(f"Temporary directory '{TEMP_DIR}' has been removed.")
 
 
+class TerraformValidator:
+    """
+    Runs validate_terraform_code on a process pool.
+    Until one repo's `terraform init` has succeeded, validations run one at a time
+    so that first init fills the shared plugin cache on its own. This only covers
+    the first repo's providers: a later init that fetches a provider the first
+    repo didn't use can still race another init downloading the same provider.
+    """
+
+    def __init__(self, executor):
+        self._executor = executor
+        self._warmup_lock = asyncio.Lock()
+        self._cache_warm = False
+
+    async def validate(self, repo_path):
+        """Returns (is_valid, combined_tf_code) for the repository at repo_path."""
+        loop = asyncio.get_running_loop()
+        if not self._cache_warm:
+            async with self._warmup_lock:
+                if not self._cache_warm:
+                    is_valid, combined_tf_code, init_succeeded = await loop.run_in_executor(
+                        self._executor, validate_terraform_code, repo_path
+                    )
+                    # The cache is filled by `init`, so a repo that fails `validate`
+                    # still warms it.
+                    self._cache_warm = init_succeeded
+                    return is_valid, combined_tf_code
+        is_valid, combined_tf_code, _ = await loop.run_in_executor(
+            self._executor, validate_terraform_code, repo_path
+        )
+        return is_valid, combined_tf_code
+
+
+async def describe_repo(repo_name, repo_path):
+    """Runs the Gemini step for a single repository. Returns the instruction JSON or None."""
+    print(f"[Step 2/3] Processing README for '{repo_name}' with Gemini Pro...")
+    try:
+        instruction_json = await process_repository_readme(repo_path, repo_name)
+    except Exception as e:
+        print(f"An unexpected error occurred while processing {repo_name}: {e}")
+        return None
+    if not instruction_json:
+        print(f"Skipping '{repo_name}' due to processing failure.")
+        return None
+    print(f"Successfully processed README for '{repo_name}'.")
+    return instruction_json
+
+
+async def validate_and_save(repo_name, repo_path, instruction_json, validator, writer):
+    """
+    Validates a repository's Terraform code and queues the resulting data pair
+    on `writer`. Returns True if a pair was saved.
+    """
+    try:
+        # Step 3: Validate Terraform code
+        print(f"[Step 3/3] Validating Terraform code for '{repo_name}'...")
+        is_valid, combined_tf_code = await validator.validate(repo_path)
+        if not is_valid:
+            print(f"Skipping '{repo_name}' due to invalid Terraform code.")
+            return False
+        print(f"Terraform code for '{repo_name}' is valid.")
+
+        # Save the final pair; the writer thread creates the directory and does the disk I/O.
+        pair_dir = os.path.join(DATASET_DIR, repo_name.replace('/', '_'))
+        instruction_path = os.path.join(pair_dir, "instruction.json")
+        code_path = os.path.join(pair_dir, "code.tf")
+
+        writer.write(instruction_path, instruction_json)
+        # The validated code is the expensive half of the pair, so it is fsync'ed.
+        writer.write(code_path, combined_tf_code, sync=True)
+
+        print(f"✅ Successfully created data pair for '{repo_name}'!")
+        return True
+
+    except Exception as e:
+        print(f"An unexpected error occurred while processing {repo_name}: {e}")
+        return False
+
+
+async def clone_stage(gemini_q, limit):
+    """
+    Stage A: clones repositories on a background thread and queues each one
+    for Gemini as soon as its clone finishes. Returns the number cloned.
+    """
+    loop = asyncio.get_running_loop()
+
+    def produce():
+        count = 0
+        for repo_name, repo_path in iter_terraform_repos(limit=limit):
+            count += 1
+            print(f"\n--- Queued repository #{count}: {repo_name} ---")
+            # Blocks this thread while the queue is full, so cloning can't run far ahead of Gemini.
+            asyncio.run_coroutine_threadsafe(gemini_q.put((repo_name, repo_path)), loop).result()
+        return count
+
+    return await asyncio.to_thread(produce)
+
+
+async def gemini_stage(gemini_q, validate_q):
+    """Stage B: takes cloned repositories off gemini_q and queues the described ones for validation."""
+    while True:
+        item = await gemini_q.get()
+        if item is None:
+            return
+        repo_name, repo_path = item
+        instruction_json = await describe_repo(repo_name, repo_path)
+        if instruction_json:
+            await validate_q.put((repo_name, repo_path, instruction_json))
+
+
+async def validation_stage(validate_q, validator, writer):
+    """Stage C: validates and saves repositories from validate_q. Returns the number of pairs written."""
+    written = 0
+    while True:
+        item = await validate_q.get()
+        if item is None:
+            return written
+        if await validate_and_save(*item, validator, writer):
+            written += 1
+
+
+async def process_all(limit, writer):
+    """
+    Runs cloning, Gemini and validation as three overlapping stages connected by
+    bounded queues. Returns (repositories cloned, data pairs created).
+    """
+    gemini_q = asyncio.Queue(maxsize=STAGE_QUEUE_SIZE)
+    validate_q = asyncio.Queue(maxsize=STAGE_QUEUE_SIZE)
+
+    with ProcessPoolExecutor(max_workers=MAX_VALIDATION_WORKERS) as executor:
+        validator = TerraformValidator(executor)
+        # Gemini concurrency and rate limits are enforced inside gemini_client.
+        gemini_workers = [
+            asyncio.create_task(gemini_stage(gemini_q, validate_q))
+            for _ in range(MAX_CONCURRENT_REQUESTS)
+        ]
+        validation_workers = [
+            asyncio.create_task(validation_stage(validate_q, validator, writer))
+            for _ in range(MAX_VALIDATION_WORKERS)
+        ]
+
+        # Each stage is shut down with one sentinel per worker once its producers are done.
+        try:
+            cloned = await clone_stage(gemini_q, limit)
+        finally:
+            for _ in gemini_workers:
+                await gemini_q.put(None)
+            await asyncio.gather(*gemini_workers)
+            for _ in validation_workers:
+                await validate_q.put(None)
+            written = await asyncio.gather(*validation_workers)
+
+    return cloned, sum(written)
+
+
 def run_pipeline():
     """
     Main function to run the entire data acquisition pipeline.
     """
     print("--- Starting Data Acquisition Pipeline ---")
     setup_directories()
+    writer = AsyncArtifactWriter()
 
     try:
-        # Step 1: Scrape repositories
+        # Step 1: Scrape repositories; each one moves on to Gemini as soon as it's cloned.
         print(f"\n[Step 1/3] Scraping up to {MAX_REPOS_TO_SCRAPE} repositories...")
-        repos_to_process = get_terraform_repos(limit=MAX_REPOS_TO_SCRAPE)
-        if not repos_to_process:
+        cloned, successful_pairs = asyncio.run(process_all(MAX_REPOS_TO_SCRAPE, writer))
+        if not cloned:
             print("No repositories found or failed to scrape. Exiting.")
             return
-        print(f"Successfully cloned {len(repos_to_process)} repositories.")
-
-        successful_pairs = 0
-        # Process each repository
-        for i, (repo_name, repo_path) in enumerate(repos_to_process.items()):
-            print(f"\n--- Processing repository {i + 1}/{len(repos_to_process)}: {repo_name} ---")
-
-            try:
-                # Step 2: Process with Gemini
-                print(f"[Step 2/3] Processing README with Gemini Pro...")
-                instruction_json = process_repository_readme(repo_path, repo_name)
-                if not instruction_json:
-                    print(f"Skipping '{repo_name}' due to processing failure.")
-                    continue
-                print(f"Successfully processed README for '{repo_name}'.")
-
-                # Step 3: Validate Terraform code
-                print(f"[Step 3/3] Validating Terraform code...")
-                is_valid, combined_tf_code = validate_terraform_code(repo_path)
-                if not is_valid:
-                    print(f"Skipping '{repo_name}' due to invalid Terraform code.")
-                    continue
-                print(f"Terraform code for '{repo_name}' is valid.")
-
-                # Save the final pair
-                pair_dir = os.path.join(DATASET_DIR, repo_name.replace('/', '_'))
-                os.makedirs(pair_dir, exist_ok=True)
-
-                instruction_path = os.path.join(pair_dir, "instruction.json")
-                code_path = os.path.join(pair_dir, "code.tf")
-
-                with open(instruction_path, 'w', encoding='utf-8') as f:
-                    f.write(instruction_json)
-                with open(code_path, 'w', encoding='utf-8') as f:
-                    f.write(combined_tf_code)
-
-                successful_pairs += 1
-                print(f"✅ Successfully created data pair for '{repo_name}'!")
-
-            except Exception as e:
-                print(f"An unexpected error occurred while processing {repo_name}: {e}")
-
-            # Small delay to respect API rate limits if any
-            time.sleep(1)
 
         print(f"\n--- Pipeline Summary ---")
-        print(f"Processed {len(repos_to_process)} repositories.")
+        print(f"Processed {cloned} repositories.")
         print(f"Successfully generated {successful_pairs} data pairs.")
         print(f"Dataset saved in: '{DATASET_DIR}'")
 
     finally:
+        writer.flush_and_close()
         # Clean up temporary files
         # cleanup()
         print("\n--- Pipeline Finished ---")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape, process and validate Terraform repositories.")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call Gemini instead of reusing cached responses."
+    )
+    args = parser.parse_args()
+
+    if args.no_cache:
+        set_cache_enabled(False)
+
     run_pipeline()
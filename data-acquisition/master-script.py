@@ -1,7 +1,8 @@
 import os
 import sys
-import subprocess
 import argparse
+import main_pipeline
+import unify_dataset
 
 # --- Configuration ---
 # This assumes all your scripts (main_pipeline.py, unify_dataset.py, etc.)
@@ -10,12 +11,13 @@ DATA_ACQUISITION_DIR = os.path.dirname(os.path.abspath(__file__))
 DATASET_DIR_NAME = "dataset"  # The default name for the dataset folder
 
 
-def run_step(step_name, command):
+def run_step(step_name, entrypoint, *args):
     """
-    Runs a pipeline step as a subprocess and prints its status.
+    Runs a pipeline step in this process and prints its status.
     Args:
         step_name (str): The name of the step for logging.
-        command (list): The command to execute as a list of strings.
+        entrypoint (callable): The step's entry function.
+        *args: Arguments passed to the entry function.
     Returns:
         bool: True if the step succeeded, False otherwise.
     """
@@ -23,19 +25,15 @@ def run_step(step_name, command):
     print(f"  RUNNING: {step_name}")
     print(f"{'=' * 20}\n")
     try:
-        # We use sys.executable to ensure we're using the same Python interpreter
-        # that is running this script.
-        process = subprocess.run(
-            [sys.executable] + command,
-            cwd=DATA_ACQUISITION_DIR,
-            check=True
-        )
+        # Steps run in-process (no new interpreter per step), so module-level
+        # state such as the configured Gemini client is shared between them.
+        entrypoint(*args)
         print(f"\n--- SUCCESS: {step_name} completed. ---\n")
         return True
-    except FileNotFoundError:
-        print(f"--- ERROR: Script for '{step_name}' not found. ---", file=sys.stderr)
-        return False
-    except subprocess.CalledProcessError:
+    except SystemExit as e:
+        if not e.code:
+            print(f"\n--- SUCCESS: {step_name} completed. ---\n")
+            return True
         print(f"--- ERROR: '{step_name}' failed to execute properly. ---", file=sys.stderr)
         return False
     except Exception as e:
@@ -49,6 +47,10 @@ def main():
     """
     print("🚀 STARTING AUTO-CLOUD-DEPLOY DATA PIPELINE 🚀")
 
+    # The steps resolve relative paths from config.py against the working
+    # directory, so run them from the data-acquisition folder as before.
+    os.chdir(DATA_ACQUISITION_DIR)
+
     dataset_path = os.path.join(DATA_ACQUISITION_DIR, DATASET_DIR_NAME)
 
     # --- STEP 1: Initial Scrape and Validation ---
@@ -56,7 +58,7 @@ def main():
     # instruction.json from the README.md.
     step1_success = run_step(
         "Initial Scrape & Validation",
-        ["main_pipeline.py"]
+        main_pipeline.run_pipeline
     )
     if not step1_success:
         print("Stopping pipeline due to failure in Step 1.", file=sys.stderr)
@@ -68,7 +70,8 @@ def main():
     # 2. Creates the final, high-quality instruction.json from diagram.xml
     step2_success = run_step(
         "Data Unification (TF -> XML -> JSON)",
-        ["unify_dataset.py", dataset_path]
+        unify_dataset.main_with_args,
+        [dataset_path]
     )
     if not step2_success:
         print("Stopping pipeline due to failure in Step 2.", file=sys.stderr)
@@ -1,7 +1,26 @@
 # processor.py
+import io
 import os
-import google.generativeai as genai
-from config import GEMINI_API_KEY, GEMINI_MODEL_NAME
+from config import GEMINI_API_KEY
+from gemini_client import get_model, stream_content, read_cache, write_cache
+
+# This is the core prompt engineering part.
+# It instructs the model on its role, the task, and the desired output format.
+PROMPT_PREFIX = """
+You are an expert DevOps engineer specializing in Terraform. Your task is to act as a text-to-JSON converter.
+Read the following README.md file for a Terraform module and generate a JSON object that represents the intended infrastructure.
+This JSON will be used as an instruction set for another model to write the Terraform code.
+
+The JSON output should be structured and hierarchical. Infer resource types, properties, and relationships from the text.
+Focus on capturing the core components being created (e.g., VPC, subnets, EC2 instances, S3 buckets, IAM roles, etc.).
+
+"""
+
+PROMPT_SUFFIX = """
+---
+
+Generate the JSON instruction object now. The output must be ONLY the JSON object, nothing else.
+"""
 
 
 def get_readme_content(repo_path):
@@ -19,7 +38,7 @@ def get_readme_content(repo_path):
         return None
 
 
-def process_repository_readme(repo_path, repo_name):
+async def process_repository_readme(repo_path, repo_name):
     """
     Uses the Gemini API to convert a repository's README into a structured
     JSON instruction for generating Terraform code.
@@ -29,8 +48,7 @@ def process_repository_readme(repo_path, repo_name):
         return None
 
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+        model = get_model()
     except Exception as e:
         print(f"Error configuring Gemini API: {e}")
         return None
@@ -39,28 +57,27 @@ def process_repository_readme(repo_path, repo_name):
     if not readme_content:
         return None
 
-    # This is the core prompt engineering part.
-    # It instructs the model on its role, the task, and the desired output format.
-    prompt = f"""
-    You are an expert DevOps engineer specializing in Terraform. Your task is to act as a text-to-JSON converter.
-    Read the following README.md file for a Terraform module and generate a JSON object that represents the intended infrastructure.
-    This JSON will be used as an instruction set for another model to write the Terraform code.
-
-    The JSON output should be structured and hierarchical. Infer resource types, properties, and relationships from the text.
-    Focus on capturing the core components being created (e.g., VPC, subnets, EC2 instances, S3 buckets, IAM roles, etc.).
+    # The README is sent as its own part between the fixed prompt text, so the
+    # (possibly large) content is never copied into a new prompt string.
+    prompt = [
+        PROMPT_PREFIX,
+        f"Here is the content of the README.md for the repository '{repo_name}':\n---\n",
+        readme_content,
+        PROMPT_SUFFIX,
+    ]
 
-    Here is the content of the README.md for the repository '{repo_name}':
-    ---
-    {readme_content}
-    ---
-
-    Generate the JSON instruction object now. The output must be ONLY the JSON object, nothing else.
-    """
+    cached_response = read_cache(prompt, "json")
+    if cached_response is not None:
+        return cached_response
 
     try:
-        response = model.generate_content(prompt)
-        # Clean up the response to ensure it's valid JSON
-        cleaned_response = response.text.strip().replace("```json", "").replace("```", "").strip()
+        # Code fences are stripped while the response streams in. The JSON is
+        # only written to the dataset once the repo passes validation, so it
+        # is collected in memory here.
+        buffer = io.StringIO()
+        await stream_content(model, prompt, buffer)
+        cleaned_response = buffer.getvalue()
+        write_cache(prompt, "json", cleaned_response)
         return cleaned_response
     except Exception as e:
         print(f"An error occurred with the Gemini API call for {repo_name}: {e}")
@@ -1,56 +1,207 @@
 # scraper.py
 import os
-import subprocess
-from github import Github, GithubException
+import json
+import time
+import shutil
+import pygit2
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import GITHUB_TOKEN, TEMP_DIR, GITHUB_SEARCH_QUERY
 
+# Cloning is almost entirely network wait, so threads overlap well here.
+MAX_CLONE_WORKERS = 16
 
-def get_terraform_repos(limit=50):
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+SEARCH_PAGE_SIZE = 100
+# Search result pages are cached per (query, page), so reruns within the TTL
+# don't hit the GitHub API at all.
+SEARCH_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scraper_cache.json")
+SEARCH_CACHE_TTL_SECONDS = 6 * 60 * 60
+
+# One request per page returns every field the scraper needs, including the
+# top-level file listing used to skip repositories without Terraform code.
+SEARCH_QUERY = """
+query($query: String!, $first: Int!, $after: String) {
+  search(query: $query, type: REPOSITORY, first: $first, after: $after) {
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      ... on Repository {
+        nameWithOwner url pushedAt
+        object(expression: "HEAD:") { ... on Tree { entries { name type } } }
+      }
+    }
+  }
+}
+"""
+
+
+def _load_search_cache():
+    try:
+        with open(SEARCH_CACHE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_search_cache(cache):
+    tmp_path = f"{SEARCH_CACHE_PATH}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, SEARCH_CACHE_PATH)
+    except OSError as e:
+        print(f"Could not write search cache {SEARCH_CACHE_PATH}: {e}")
+
+
+def _has_terraform(node):
+    """True if the repository has a top-level .tf file or a modules/ directory."""
+    tree = node.get("object") or {}
+    for entry in tree.get("entries") or []:
+        if entry["type"] == "blob" and entry["name"].endswith(".tf"):
+            return True
+        if entry["type"] == "tree" and entry["name"] == "modules":
+            return True
+    return False
+
+
+def _fetch_search_page(session, query, after):
+    """Fetches one page of search results through the GitHub GraphQL API."""
+    response = session.post(
+        GITHUB_GRAPHQL_URL,
+        json={"query": SEARCH_QUERY, "variables": {"query": query, "first": SEARCH_PAGE_SIZE, "after": after}},
+        timeout=30
+    )
+    response.raise_for_status()
+    payload = response.json()
+    if payload.get("errors"):
+        raise RuntimeError(f"GitHub GraphQL error: {payload['errors']}")
+
+    search = payload["data"]["search"]
+    return {
+        "fetched_at": time.time(),
+        "repos": [
+            {
+                "full_name": node["nameWithOwner"],
+                "clone_url": f"{node['url']}.git",
+                "pushed_at": node["pushedAt"],
+                "has_terraform": _has_terraform(node),
+            }
+            for node in search["nodes"] if node
+        ],
+        "has_next_page": search["pageInfo"]["hasNextPage"],
+        "end_cursor": search["pageInfo"]["endCursor"],
+    }
+
+
+def search_repositories(query):
+    """
+    Yields {full_name, clone_url, pushed_at, has_terraform} dicts for a GitHub search query,
+    page by page. Pages cached less than SEARCH_CACHE_TTL_SECONDS ago are reused.
+    """
+    cache = _load_search_cache()
+    with requests.Session() as session:
+        session.headers["Authorization"] = f"bearer {GITHUB_TOKEN}"
+        after = None
+        page = 0
+        while True:
+            key = f"{query}|{page}"
+            entry = cache.get(key)
+            if entry is None or time.time() - entry["fetched_at"] > SEARCH_CACHE_TTL_SECONDS:
+                entry = _fetch_search_page(session, query, after)
+                cache[key] = entry
+                _save_search_cache(cache)
+
+            yield from entry["repos"]
+
+            if not entry["has_next_page"]:
+                return
+            after = entry["end_cursor"]
+            page += 1
+
+
+def _clone_one(repo, repo_path):
+    """
+    Shallow-clones a single repository (and any submodules) into repo_path.
+    Returns the repo's full name on success, None on failure.
+    """
+    print(f"Cloning '{repo['full_name']}' into '{repo_path}'...")
+    try:
+        # libgit2 clones in-process, so there is no git subprocess per repo, and
+        # it releases the GIL during network I/O so the thread pool still overlaps clones.
+        cloned = pygit2.clone_repository(repo["clone_url"], repo_path, depth=1)
+    except pygit2.GitError as e:
+        print(f"Failed to clone {repo['full_name']}. Error: {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred during clone: {e}")
+    else:
+        if os.path.exists(os.path.join(repo_path, ".gitmodules")):
+            # A submodule that can't be fetched (private, moved, deleted) shouldn't
+            # cost us the main checkout, which is still worth scanning.
+            try:
+                cloned.submodules.update(init=True, depth=1)
+            except Exception as e:
+                print(f"Could not update submodules of {repo['full_name']}; keeping the main checkout. Error: {e}")
+        return repo["full_name"]
+    # Don't leave a partial checkout behind, or the next run would skip this repo.
+    shutil.rmtree(repo_path, ignore_errors=True)
+    return None
+
+
+def iter_terraform_repos(limit=50):
     """
     Finds and clones popular Terraform repositories from GitHub.
-    Returns a dictionary of {repo_name: local_path}.
+    Yields (repo_name, local_path) as soon as each clone finishes, so callers
+    can start working on a repository while the others are still cloning.
     """
     try:
-        g = Github(GITHUB_TOKEN)
         query = GITHUB_SEARCH_QUERY
         print(f"Searching GitHub with query: '{query}'")
-        repositories = g.search_repositories(query=query)
-
-        cloned_repos = {}
-        count = 0
 
-        for repo in repositories:
-            if count >= limit:
+        # First pass: pick the repositories to clone so the clones can run concurrently.
+        to_clone = []
+        for repo in search_repositories(query):
+            if len(to_clone) >= limit:
                 break
 
-            repo_path = os.path.join(TEMP_DIR, repo.full_name.replace('/', '_'))
+            # Pages cached before the file listing was fetched have no flag; keep those repos.
+            if not repo.get("has_terraform", True):
+                print(f"Repository '{repo['full_name']}' has no top-level Terraform files. Skipping clone.")
+                continue
+
+            repo_path = os.path.join(TEMP_DIR, repo["full_name"].replace('/', '_'))
 
             if os.path.exists(repo_path):
-                print(f"Repository '{repo.full_name}' already exists locally. Skipping clone.")
+                print(f"Repository '{repo['full_name']}' already exists locally. Skipping clone.")
                 continue
 
-            print(f"Cloning '{repo.full_name}' into '{repo_path}'...")
-            try:
-                # Using subprocess to clone for better performance with large repos
-                subprocess.run(
-                    ["git", "clone", "--depth", "1", repo.clone_url, repo_path],
-                    check=True,
-                    capture_output=True,
-                    text=True
-                )
-                cloned_repos[repo.full_name] = repo_path
-                count += 1
-            except subprocess.CalledProcessError as e:
-                print(f"Failed to clone {repo.full_name}. Error: {e.stderr}")
-            except Exception as e:
-                print(f"An unexpected error occurred during clone: {e}")
-
-        return cloned_repos
+            to_clone.append((repo, repo_path))
 
-    except GithubException as e:
-        print(f"GitHub API Error: {e.status} - {e.data}")
+    except requests.HTTPError as e:
+        print(f"GitHub API Error: {e.response.status_code} - {e.response.text}")
         print("Please check your GITHUB_TOKEN in config.py. Using an invalid or rate-limited token can cause this.")
-        return {}
+        return
     except Exception as e:
         print(f"An unexpected error occurred while scraping GitHub: {e}")
-        return {}
+        return
+
+    count = 0
+    with ThreadPoolExecutor(max_workers=MAX_CLONE_WORKERS) as executor:
+        futures = {
+            executor.submit(_clone_one, repo, repo_path): repo_path
+            for repo, repo_path in to_clone
+        }
+        for future in as_completed(futures):
+            full_name = future.result()
+            if full_name:
+                count += 1
+                yield full_name, futures[future]
+
+    print(f"Cloned {count}/{len(to_clone)} repositories.")
+
+
+def get_terraform_repos(limit=50):
+    """
+    Finds and clones popular Terraform repositories from GitHub.
+    Returns a dictionary of {repo_name: local_path}.
+    """
+    return dict(iter_terraform_repos(limit))
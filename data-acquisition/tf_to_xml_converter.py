@@ -1,11 +1,69 @@
 # tf_to_xml_converter.py
+import io
 import os
-import time
+import re
+import asyncio
 import argparse
 import sys
 import xml.etree.ElementTree as ET
-import google.generativeai as genai
-from config import GEMINI_API_KEY, GEMINI_MODEL_NAME
+from xml.sax.saxutils import quoteattr
+from config import GEMINI_API_KEY
+from gemini_client import get_model, stream_content, read_cache, write_cache, write_cache_from_file, set_cache_enabled
+
+PROMPT_PREFIX = """
+You are an expert cloud architect and a specialist in both Terraform HCL and the Draw.io XML format.
+Your task is to convert the following Terraform code into a complete, valid, and visually coherent Draw.io XML file.
+
+Analyze the resources, their relationships (e.g., a subnet inside a VPC, an instance in a subnet), and any explicit dependencies.
+Create a visual representation of this architecture.
+- Use appropriate AWS icons from the Draw.io library (e.g., `shape=mxgraph.aws4.group_vpc`, `resIcon=mxgraph.aws4.ec2`).
+- Arrange the elements logically with clear containment (e.g., resources inside subnets, subnets inside VPCs).
+- Ensure the final output is a single, complete XML block that can be opened directly in Draw.io.
+
+The output MUST be only the raw XML content, starting with `<?xml version="1.0" encoding="UTF-8"?>` and enclosed in `<mxfile>`. Do not include any other text, explanations, or markdown code fences.
+
+Terraform Code:
+---
+"""
+
+PROMPT_SUFFIX = """
+---
+"""
+
+# Written instead of calling Gemini when the Terraform code declares nothing to draw.
+MINIMAL_XML_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<mxfile host="app.diagrams.net">
+  <diagram name={name} id="empty">
+    <mxGraphModel>
+      <root>
+        <mxCell id="0" />
+        <mxCell id="1" parent="0" />
+      </root>
+    </mxGraphModel>
+  </diagram>
+</mxfile>
+"""
+# Below this many characters of non-comment code there is nothing worth diagramming.
+MIN_TERRAFORM_LENGTH = 64
+# Only block comments span lines; `#` and `//` comments end at the newline.
+TF_COMMENT_PATTERN = re.compile(r"(?s:/\*.*?\*/)|#[^\n]*|//[^\n]*")
+TF_BLOCK_PATTERN = re.compile(r'\b(?:resource|module)\s+"')
+
+
+def is_trivial_terraform(terraform_code):
+    """
+    True if the code (ignoring comments) is too short or declares no resources or modules.
+
+    Code combined by validator.find_and_combine_tf_files() starts with a comment header:
+
+    >>> code = 'resource "aws_instance" "web" {\\n  ami = "ami-123456"  # ubuntu\\n  instance_type = "t3.micro"\\n}\\n'
+    >>> is_trivial_terraform('# --- From: main.tf ---\\n' + code)
+    False
+    >>> is_trivial_terraform('# --- From: main.tf ---\\n/*\\n' + code + '*/\\n')
+    True
+    """
+    stripped = TF_COMMENT_PATTERN.sub("", terraform_code).strip()
+    return len(stripped) < MIN_TERRAFORM_LENGTH or not TF_BLOCK_PATTERN.search(stripped)
 
 
 def get_tf_file_content(directory_path):
@@ -24,53 +82,71 @@ def get_tf_file_content(directory_path):
     return None
 
 
-def generate_drawio_xml(terraform_code, retries=3, delay=5):
+async def generate_drawio_xml(terraform_code, retries=3, delay=5, output_path=None, diagram_name="Untitled",
+                              as_bytes=False):
     """
     Uses the Gemini API to convert Terraform code into a Draw.io XML string.
+    If output_path is given, the response is streamed straight into that file
+    and the path is returned instead of the XML string.
+    With as_bytes=True the XML is returned UTF-8 encoded, e.g. to send it as an
+    HTTP response body without encoding it again.
+    Trivial code (see is_trivial_terraform) gets an empty diagram without an API call.
     """
+    if is_trivial_terraform(terraform_code):
+        print("  - Terraform code declares no resources; writing an empty diagram.", file=sys.stderr)
+        xml_content = MINIMAL_XML_TEMPLATE.format(name=quoteattr(diagram_name))
+        if output_path:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(xml_content)
+            return output_path
+        return xml_content.encode('utf-8') if as_bytes else xml_content
+
     if not GEMINI_API_KEY or GEMINI_API_KEY == 'PASTE_YOUR_GEMINI_API_KEY_HERE':
         print("  - ERROR: Gemini API Key not configured.", file=sys.stderr)
         return None
 
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+        model = get_model()
     except Exception as e:
         print(f"  - Error configuring Gemini API: {e}", file=sys.stderr)
         return None
 
-    prompt = f"""
-    You are an expert cloud architect and a specialist in both Terraform HCL and the Draw.io XML format.
-    Your task is to convert the following Terraform code into a complete, valid, and visually coherent Draw.io XML file.
-
-    Analyze the resources, their relationships (e.g., a subnet inside a VPC, an instance in a subnet), and any explicit dependencies.
-    Create a visual representation of this architecture.
-    - Use appropriate AWS icons from the Draw.io library (e.g., `shape=mxgraph.aws4.group_vpc`, `resIcon=mxgraph.aws4.ec2`).
-    - Arrange the elements logically with clear containment (e.g., resources inside subnets, subnets inside VPCs).
-    - Ensure the final output is a single, complete XML block that can be opened directly in Draw.io.
+    # The Terraform code is sent as its own part, so it's never copied into a new prompt string.
+    prompt = [PROMPT_PREFIX, terraform_code, PROMPT_SUFFIX]
 
-    The output MUST be only the raw XML content, starting with `<?xml version="1.0" encoding="UTF-8"?>` and enclosed in `<mxfile>`. Do not include any other text, explanations, or markdown code fences.
-
-    Terraform Code:
-    ---
-    {terraform_code}
-    ---
-    """
+    # Bytes are copied to output_path or returned as they are, without decoding them first.
+    cached_xml = read_cache(prompt, "xml", binary=bool(output_path or as_bytes))
+    if cached_xml is not None:
+        if output_path:
+            with open(output_path, 'wb') as f:
+                f.write(cached_xml)
+            return output_path
+        return cached_xml
 
+    partial_path = f"{output_path}.part" if output_path else None
     for attempt in range(retries):
         try:
-            response = model.generate_content(prompt)
-            # Clean up the response to get raw XML
-            xml_content = response.text.strip()
-            if xml_content.startswith("```xml"):
-                xml_content = xml_content[6:].strip()
-            if xml_content.endswith("```"):
-                xml_content = xml_content[:-3].strip()
+            if output_path:
+                # Write chunks to disk as they arrive; the target is only replaced once the XML is valid.
+                with open(partial_path, 'w', encoding='utf-8') as f:
+                    await stream_content(model, prompt, f)
+                ET.parse(partial_path)
+                os.replace(partial_path, output_path)
+                # Only well-formed XML is cached, so a failed attempt is retried next run.
+                write_cache_from_file(prompt, "xml", output_path)
+                return output_path
+
+            buffer = io.StringIO()
+            await stream_content(model, prompt, buffer)
+            xml_content = buffer.getvalue()
+            xml_bytes = xml_content.encode('utf-8')
 
             # Validate that the response is well-formed XML
-            ET.fromstring(xml_content)
+            ET.fromstring(xml_bytes)
 
-            return xml_content
+            # Only well-formed XML is cached, so a failed attempt is retried next run.
+            write_cache(prompt, "xml", xml_content)
+            return xml_bytes if as_bytes else xml_content
         except ET.ParseError as e:
             print(f"  - Attempt {attempt + 1} failed: Gemini returned invalid XML. Error: {e}", file=sys.stderr)
         except Exception as e:
@@ -78,13 +154,49 @@ def generate_drawio_xml(terraform_code, retries=3, delay=5):
 
         if attempt < retries - 1:
             print(f"  - Retrying in {delay} seconds...", file=sys.stderr)
-            time.sleep(delay)
+            await asyncio.sleep(delay)
 
+    if partial_path and os.path.exists(partial_path):
+        os.remove(partial_path)
     return None
 
 
-def main():
-    """Main function to run the automation script."""
+async def convert_directory(dataset_dir, dir_name, progress):
+    """Generates 'diagram.xml' for a single dataset entry if it doesn't exist yet."""
+    full_dir_path = os.path.join(dataset_dir, dir_name)
+    print(f"{progress} Processing: {dir_name}")
+
+    output_xml_path = os.path.join(full_dir_path, "diagram.xml")
+    if os.path.exists(output_xml_path):
+        print(f"  - [{dir_name}] Skipping: 'diagram.xml' already exists.")
+        return
+
+    tf_code = get_tf_file_content(full_dir_path)
+    if not tf_code:
+        print(f"  - [{dir_name}] Skipping: No .tf file found.")
+        return
+
+    print(f"  - [{dir_name}] Found Terraform code. Generating diagram with Gemini Pro...")
+    if await generate_drawio_xml(tf_code, output_path=output_xml_path, diagram_name=dir_name):
+        print(f"  - [{dir_name}] ✅ Successfully created 'diagram.xml'")
+    else:
+        print(f"  - ❌ Failed to generate diagram for {dir_name}.")
+
+
+async def convert_dataset(dataset_dir):
+    """Converts every dataset entry concurrently; Gemini calls are throttled by gemini_client."""
+    subdirectories = [d for d in os.listdir(dataset_dir) if os.path.isdir(os.path.join(dataset_dir, d))]
+    await asyncio.gather(*(
+        convert_directory(dataset_dir, dir_name, f"[{i + 1}/{len(subdirectories)}]")
+        for i, dir_name in enumerate(subdirectories)
+    ))
+
+
+def main_with_args(argv=None):
+    """
+    Runs the converter with the given command-line arguments (defaults to sys.argv).
+    Lets other pipeline steps call the converter in-process.
+    """
     parser = argparse.ArgumentParser(
         description="Automates the generation of Draw.io XML diagrams from Terraform files in a dataset."
     )
@@ -92,7 +204,15 @@ def main():
         "dataset_dir",
         help="The path to the dataset directory (e.g., 'data-acquisition/dataset')."
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call Gemini instead of reusing cached responses."
+    )
+    args = parser.parse_args(argv)
+
+    if args.no_cache:
+        set_cache_enabled(False)
 
     if not os.path.isdir(args.dataset_dir):
         print(f"Error: Directory not found at '{args.dataset_dir}'", file=sys.stderr)
@@ -101,39 +221,14 @@ def main():
     print(f"--- Starting Terraform to Draw.io XML Conversion ---")
     print(f"Scanning directory: {args.dataset_dir}\n")
 
-    subdirectories = [d for d in os.listdir(args.dataset_dir) if os.path.isdir(os.path.join(args.dataset_dir, d))]
-
-    for i, dir_name in enumerate(subdirectories):
-        full_dir_path = os.path.join(args.dataset_dir, dir_name)
-        print(f"[{i + 1}/{len(subdirectories)}] Processing: {dir_name}")
-
-        output_xml_path = os.path.join(full_dir_path, "diagram.xml")
-        if os.path.exists(output_xml_path):
-            print(f"  - Skipping: 'diagram.xml' already exists.")
-            continue
+    asyncio.run(convert_dataset(args.dataset_dir))
 
-        tf_code = get_tf_file_content(full_dir_path)
-        if not tf_code:
-            print(f"  - Skipping: No .tf file found.")
-            continue
-
-        print("  - Found Terraform code. Generating diagram with Gemini Pro...")
-        drawio_xml = generate_drawio_xml(tf_code)
-
-        if drawio_xml:
-            try:
-                with open(output_xml_path, 'w', encoding='utf-8') as f:
-                    f.write(drawio_xml)
-                print(f"  - ✅ Successfully created 'diagram.xml'")
-            except Exception as e:
-                print(f"  - ERROR: Could not write to {output_xml_path}. Error: {e}", file=sys.stderr)
-        else:
-            print(f"  - ❌ Failed to generate diagram for {dir_name}.")
+    print("\n--- Pipeline Finished ---")
 
-        # Add a small delay to be respectful of API rate limits
-        time.sleep(2)
 
-    print("\n--- Pipeline Finished ---")
+def main():
+    """Main function to run the automation script."""
+    main_with_args()
 
 
 if __name__ == "__main__":
@@ -3,70 +3,101 @@ import os
 import sys
 import argparse
 import json
-import subprocess
-
+from functools import partial
+from multiprocessing import Pool
+import tf_to_xml_converter
 
 # --- Helper Functions from your existing scripts ---
 # We assume tf_to_xml_converter.py and xml_parser_v3.py are in the same directory
-# or accessible via python path. For simplicity, we can call them as subprocesses.
-
-def run_tf_to_xml(dataset_dir):
-    """Runs the Terraform to Draw.io converter script and returns success status."""
+# or accessible via python path. Both are imported and called in-process; the
+# XML parser is then loaded only once per pool worker. If no
+# xml_parser_v3.py has been copied here, fall back to the repo's
+# xml-to-json-parser/xml_parser.py.
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "xml-to-json-parser"))
+try:
+    import xml_parser_v3
+except ImportError:
+    import xml_parser as xml_parser_v3
+
+
+def run_tf_to_xml(dataset_dir, use_cache=True):
+    """Runs the Terraform to Draw.io converter and returns success status."""
     print("\n--- Running Step 1: Terraform to XML Conversion ---")
+    argv = [dataset_dir]
+    if not use_cache:
+        argv.append("--no-cache")
     try:
-        # We pass stdout and stderr to the main process to see real-time progress
-        process = subprocess.run(
-            [sys.executable, "tf_to_xml_converter.py", dataset_dir],
-            check=True
-        )
+        tf_to_xml_converter.main_with_args(argv)
         print("--- Finished XML Conversion ---\n")
         return True
-    except FileNotFoundError:
-        print("Error: 'tf_to_xml_converter.py' not found.", file=sys.stderr)
+    except SystemExit as e:
+        if not e.code:
+            return True
+        print(f"Error running tf_to_xml_converter. It exited with status {e.code}.", file=sys.stderr)
         return False
-    except subprocess.CalledProcessError as e:
-        print(f"Error running tf_to_xml_converter.py. It exited with a non-zero status.", file=sys.stderr)
+    except Exception as e:
+        print(f"Error running tf_to_xml_converter: {e}", file=sys.stderr)
         return False
 
 
 def run_xml_to_json(xml_file_path, output_json_path):
     """Runs the XML to JSON parser for a single file."""
     try:
-        result = subprocess.run(
-            [sys.executable, "xml_parser_v3.py", xml_file_path],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        with open(output_json_path, 'w', encoding='utf-8') as f:
-            f.write(result.stdout)
+        # The parser writes the JSON file itself, so no intermediate string is built here.
+        if xml_parser_v3.parse_file_to_json(xml_file_path, output_json_path) is None:
+            print(f"  - Error parsing {xml_file_path}: parser produced no output.", file=sys.stderr)
+            return False
         return True
-    except FileNotFoundError:
-        print(f"  - Error: 'xml_parser_v3.py' not found.", file=sys.stderr)
-        return False
-    except subprocess.CalledProcessError as e:
-        print(f"  - Error parsing {xml_file_path}: {e.stderr}", file=sys.stderr)
+    except Exception as e:
+        print(f"  - Error parsing {xml_file_path}: {e}", file=sys.stderr)
         return False
 
 
-def main():
+def convert_directory(dataset_dir, dir_name):
+    """
+    Pool worker: generates 'instruction.json' for one dataset entry.
+    Returns (dir_name, status) where status is 'exists', 'missing_xml', 'created' or 'failed'.
+    """
+    full_dir_path = os.path.join(dataset_dir, dir_name)
+    xml_path = os.path.join(full_dir_path, "diagram.xml")
+    json_path = os.path.join(full_dir_path, "instruction.json")
+
+    if os.path.exists(json_path):
+        return dir_name, "exists"
+
+    if not os.path.exists(xml_path):
+        return dir_name, "missing_xml"
+
+    # The JSON is written here in the worker so only a short status travels back over IPC.
+    if run_xml_to_json(xml_path, json_path):
+        return dir_name, "created"
+    return dir_name, "failed"
+
+
+def main_with_args(argv=None):
     """
     Main orchestrator to ensure every dataset entry has all three required files:
     code.tf, diagram.xml, and instruction.json.
+    Parses the given command-line arguments (defaults to sys.argv).
     """
     parser = argparse.ArgumentParser(description="Unify the dataset by generating missing files.")
     parser.add_argument(
         "dataset_dir",
         help="The path to the dataset directory (e.g., 'data-acquisition/dataset')."
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call Gemini instead of reusing cached responses."
+    )
+    args = parser.parse_args(argv)
 
     if not os.path.isdir(args.dataset_dir):
         print(f"Error: Directory not found at '{args.dataset_dir}'", file=sys.stderr)
         sys.exit(1)
 
     # Step 1: Ensure all .tf files have a corresponding .xml file
-    run_tf_to_xml(args.dataset_dir)
+    run_tf_to_xml(args.dataset_dir, use_cache=not args.no_cache)
 
     # Step 2: Ensure all .xml files have a corresponding .json file
     print("--- Running Step 2: XML to JSON Conversion ---")
@@ -75,30 +106,23 @@ def main():
     successful_json_conversions = 0
     failed_json_conversions = []
 
-    for i, dir_name in enumerate(subdirectories):
-        full_dir_path = os.path.join(args.dataset_dir, dir_name)
-        print(f"[{i + 1}/{len(subdirectories)}] Verifying: {dir_name}")
-
-        xml_path = os.path.join(full_dir_path, "diagram.xml")
-        json_path = os.path.join(full_dir_path, "instruction.json")
-
-        if os.path.exists(json_path):
-            print("  - Skipping: 'instruction.json' already exists.")
-            successful_json_conversions += 1
-            continue
-
-        if not os.path.exists(xml_path):
-            print("  - Skipping: 'diagram.xml' not found.")
-            # This directory is skipped because the pre-requisite is missing
-            continue
-
-        print("  - Found 'diagram.xml', generating 'instruction.json'...")
-        if run_xml_to_json(xml_path, json_path):
-            print("  - ✅ Successfully created 'instruction.json'")
-            successful_json_conversions += 1
-        else:
-            print("  - ❌ Failed to create 'instruction.json'")
-            failed_json_conversions.append(dir_name)
+    with Pool(os.cpu_count()) as pool:
+        results = pool.imap_unordered(partial(convert_directory, args.dataset_dir), subdirectories, chunksize=8)
+        for i, (dir_name, status) in enumerate(results):
+            print(f"[{i + 1}/{len(subdirectories)}] Verifying: {dir_name}")
+
+            if status == "exists":
+                print("  - Skipping: 'instruction.json' already exists.")
+                successful_json_conversions += 1
+            elif status == "missing_xml":
+                # This directory is skipped because the pre-requisite is missing
+                print("  - Skipping: 'diagram.xml' not found.")
+            elif status == "created":
+                print("  - ✅ Successfully created 'instruction.json'")
+                successful_json_conversions += 1
+            else:
+                print("  - ❌ Failed to create 'instruction.json'")
+                failed_json_conversions.append(dir_name)
 
     print("\n--- Unification Complete ---")
     print(f"JSON Conversion Summary: {successful_json_conversions} successful, {len(failed_json_conversions)} failed.")
@@ -107,6 +131,10 @@ def main():
     print("Your dataset is now ready for model training.")
 
 
+def main():
+    main_with_args()
+
+
 if __name__ == "__main__":
     main()
 
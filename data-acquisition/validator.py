@@ -1,77 +1,187 @@
 # validator.py
 import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# File reads release the GIL, so a small thread pool lets the OS service many of
+# them at once instead of paying each file's latency in turn.
+MAX_READ_WORKERS = 16
+SEPARATOR = b"\n\n"
+
+# Provider plugins downloaded by `terraform init` are shared across all repos
+# through this cache instead of being fetched again for every repository.
+TF_PLUGIN_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tf_plugin_cache")
+
+
+def _read_into(file_path, view):
+    """
+    Reads a file straight into `view` (a slice of the shared output buffer).
+    Returns True if the file filled the view exactly.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            return f.readinto(view) == len(view) and not f.read(1)
+    except OSError as e:
+        print(f"Could not read file {file_path}: {e}")
+        return False
+
+
+def _read_bytes(file_path):
+    """Reads a whole file, or returns None if it can't be read."""
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read()
+    except OSError as e:
+        print(f"Could not read file {file_path}: {e}")
+        return None
+
+
+def _walk_tf(path):
+    """
+    Yields a DirEntry for every .tf file under path, in the same order as
+    os.walk(): a directory's files first, then its subdirectories.
+    """
+    # Avoid processing .terraform directories which contain provider plugins
+    if '.terraform' in path:
+        return
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    # Like os.walk, don't descend into symlinked directories.
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                elif entry.name.endswith(".tf"):
+                    yield entry
+    except OSError:
+        return
+    for subdir in subdirs:
+        yield from _walk_tf(subdir)
 
 
 def find_and_combine_tf_files(repo_path):
     """Finds all .tf files in a directory and combines their content."""
-    combined_code = []
-    has_tf_files = False
-    for root, _, files in os.walk(repo_path):
-        # Avoid processing .terraform directories which contain provider plugins
-        if '.terraform' in root:
-            continue
-        for file in files:
-            if file.endswith(".tf"):
-                has_tf_files = True
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        # Add a comment to denote the origin of the code block
-                        combined_code.append(f"# --- From: {os.path.relpath(file_path, repo_path)} ---")
-                        combined_code.append(f.read())
-                except Exception as e:
-                    print(f"Could not read file {file_path}: {e}")
-
-    if not has_tf_files:
+    # Pass 1: collect the paths and sizes of all .tf files
+    tf_files = []
+    for entry in _walk_tf(repo_path):
+        try:
+            tf_files.append((entry.path, entry.stat().st_size))
+        except OSError as e:
+            print(f"Could not read file {entry.path}: {e}")
+
+    if not tf_files:
         return None
 
-    return "\n\n".join(combined_code)
+    # Lay out "header, content, header, content, ..." joined by blank lines in a
+    # single pre-sized buffer, so file contents are read once, in place, and
+    # decoded only at the very end.
+    layout = []
+    offset = 0
+    for file_path, size in tf_files:
+        if layout:
+            offset += len(SEPARATOR)
+        # Add a comment to denote the origin of the code block
+        header = f"# --- From: {os.path.relpath(file_path, repo_path)} ---".encode('utf-8', 'surrogateescape')
+        content_start = offset + len(header) + len(SEPARATOR)
+        layout.append((header, offset, content_start, content_start + size))
+        offset = content_start + size
+
+    buf = bytearray(offset)
+    view = memoryview(buf)
+    for header, header_start, content_start, _ in layout:
+        if header_start:
+            view[header_start - len(SEPARATOR):header_start] = SEPARATOR
+        view[header_start:content_start] = header + SEPARATOR
+
+    # Pass 2: read the files concurrently, each into its own slice of the buffer
+    with ThreadPoolExecutor(max_workers=MAX_READ_WORKERS) as executor:
+        filled = list(executor.map(
+            _read_into,
+            [file_path for file_path, _ in tf_files],
+            [view[start:end] for _, _, start, end in layout]
+        ))
+    view.release()
+
+    if not all(filled):
+        # A file failed to read or changed size since it was stat'ed; assemble
+        # the output piecewise for this (rare) case instead.
+        parts = []
+        for (file_path, _), (header, _, start, end), ok in zip(tf_files, layout, filled):
+            content = bytes(buf[start:end]) if ok else _read_bytes(file_path)
+            if content is not None:
+                parts.append(header)
+                parts.append(content)
+        buf = SEPARATOR.join(parts)
+
+    combined_code = buf.decode('utf-8', 'replace')
+    if "\r" in combined_code:
+        # Match text-mode reads, which normalize Windows line endings
+        combined_code = combined_code.replace("\r\n", "\n").replace("\r", "\n")
+    return combined_code
 
 
 def validate_terraform_code(repo_path):
     """
     Runs `terraform init` and `terraform validate` in the specified directory.
-    Returns a tuple of (is_valid, combined_tf_code).
+    Returns a tuple of (is_valid, combined_tf_code, init_succeeded); init_succeeded
+    tells callers whether `terraform init` completed, even if validation then failed.
     """
     combined_code = find_and_combine_tf_files(repo_path)
     if not combined_code:
         print(f"No .tf files found in {repo_path}.")
-        return False, None
+        return False, None, False
+
+    terraform_env = {
+        **os.environ,
+        "TF_PLUGIN_CACHE_DIR": TF_PLUGIN_CACHE_DIR,
+        # Scraped repos rarely ship a lock file. Without this, Terraform >= 1.4
+        # refuses to use cached providers that aren't recorded in one.
+        "TF_PLUGIN_CACHE_MAY_BREAK_DEPENDENCY_LOCK_FILE": "1",
+        "TF_IN_AUTOMATION": "1",
+    }
 
+    init_succeeded = False
     try:
-        # Step 1: Run terraform init
+        # Step 1: Run terraform init (no remote backend is needed just to validate)
         print("Running 'terraform init'...")
         init_process = subprocess.run(
-            ["terraform", "init", "-no-color"],
+            ["terraform", "init", "-no-color", "-input=false", "-upgrade=false", "-backend=false"],
             cwd=repo_path,
+            env=terraform_env,
             capture_output=True,
             text=True,
             check=True
         )
         print("'terraform init' successful.")
+        init_succeeded = True
 
         # Step 2: Run terraform validate
         print("Running 'terraform validate'...")
         validate_process = subprocess.run(
             ["terraform", "validate", "-no-color"],
             cwd=repo_path,
+            env=terraform_env,
             capture_output=True,
             text=True,
             check=True
         )
         print("'terraform validate' successful.")
 
-        return True, combined_code
+        return True, combined_code, init_succeeded
 
     except FileNotFoundError:
         print("ERROR: 'terraform' command not found.")
         print("Please install Terraform and ensure it's in your system's PATH.")
-        return False, None
+        return False, None, init_succeeded
     except subprocess.CalledProcessError as e:
         print(f"Terraform command failed in {repo_path}.")
         print(f"Stderr:\n{e.stderr}")
-        return False, None
+        return False, None, init_succeeded
     except Exception as e:
         print(f"An unexpected error occurred during validation: {e}")
-        return False, None
+        return False, None, init_succeeded
@@ -0,0 +1,33 @@
+# _containment_jit.py
+"""
+Numba kernel for xml_parser.find_parents(). Kept in its own module because
+importing Numba takes longer than parsing most diagrams: xml_parser only
+imports this module once a diagram is big enough to use it.
+"""
+import numpy as np
+from numba import njit, prange
+
+
+@njit(cache=True)
+def _best_in_range(child, lo, hi, best, best_area, xs, ys, x2s, y2s, areas):
+    for j in range(lo, hi):
+        if (xs[child] >= xs[j] and ys[child] >= ys[j] and
+                x2s[child] <= x2s[j] and y2s[child] <= y2s[j]):
+            # Strictly smaller only, so ties go to the earlier node.
+            if best < 0 or areas[j] < best_area:
+                best = j
+                best_area = areas[j]
+    return best, best_area
+
+
+@njit(cache=True, parallel=True)
+def best_parent_kernel(xs, ys, x2s, y2s, areas):
+    n = xs.shape[0]
+    parents = np.full(n, -1, dtype=np.int64)
+    for child in prange(n):
+        # Nodes before the child, then nodes after it, so a node is never
+        # compared with itself.
+        best, best_area = _best_in_range(child, 0, child, -1, 0.0, xs, ys, x2s, y2s, areas)
+        best, best_area = _best_in_range(child, child + 1, n, best, best_area, xs, ys, x2s, y2s, areas)
+        parents[child] = best
+    return parents
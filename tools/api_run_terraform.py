@@ -1,10 +1,7 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI
 from pydantic import BaseModel
-import subprocess
-import tempfile
-import os
-import shutil
 from typing import Optional
+from terraform_worker import TerraformWorker
 
 app = FastAPI(title="Auto Cloud Deploy - Run Terraform API")
 
@@ -18,45 +15,31 @@ def health():
     return {"status": "ok", "service": "run-terraform"}
 
 
+# Requests `docker exec` into this long-running container (see terraform_worker.py).
+TF_WORKER_NAME = "tf-worker"
+tf_worker = TerraformWorker(TF_WORKER_NAME)
+
+
+@app.on_event("startup")
+async def start_terraform_worker():
+    """Pull the Terraform image and start the shared worker container."""
+    await tf_worker.start()
+
+
+@app.on_event("shutdown")
+async def stop_terraform_worker():
+    await tf_worker.stop()
+
+
 @app.post("/run-terraform")
-def run_terraform(data: TerraformInput, timeout_seconds: Optional[int] = 120):
-    """Save incoming Terraform code to a temporary directory and run it inside a Dockerized Terraform image."""
-    tmpdir = tempfile.mkdtemp()
-    tf_file = os.path.join(tmpdir, "main.tf")
-
-    try:
-        with open(tf_file, "w", encoding="utf-8") as f:
-            f.write(data.terraform)
-
-        cmd = [
-            "docker", "run", "--rm",
-            "--net", "none",
-            "--cpus", "1", "--memory", "512m",
-            "-v", f"{tmpdir}:/workspace",
-            "-w", "/workspace",
-            "hashicorp/terraform:1.9.0",
-            "sh", "-c",
-            "terraform init -input=false && terraform apply -auto-approve"
-        ]
-
-        process = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout_seconds)
-
-        if process.returncode == 0:
-            return {"status": "success", "output": process.stdout.strip()}
-        else:
-            return {"status": "failed", "error": process.stderr.strip()}
-
-    except subprocess.TimeoutExpired:
-        return {"status": "failed", "error": "Terraform execution timed out"}
-
-    except FileNotFoundError as e:
-        raise HTTPException(status_code=500, detail=f"Docker not found on server: {str(e)}")
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Execution error: {str(e)}")
-
-    finally:
-        shutil.rmtree(tmpdir, ignore_errors=True)
+async def run_terraform(data: TerraformInput, timeout_seconds: Optional[int] = 120):
+    """Save incoming Terraform code to a workspace in the worker container and run it inside a Dockerized Terraform image.
+
+    All requests run in one shared worker container limited to 1 CPU and 512m of memory in total,
+    so concurrent runs compete for that budget and a run that exhausts the memory can get other
+    requests' runs OOM-killed. A run that times out is killed together with its child processes.
+    """
+    return await tf_worker.run(data.terraform, timeout_seconds)
 
 
 if __name__ == "__main__":
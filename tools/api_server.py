@@ -1,14 +1,12 @@
 from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-import subprocess
-import tempfile
-import os
-import shutil
 from pathlib import Path
-import importlib.util
+import sys
 from typing import Optional
+from terraform_worker import TerraformWorker
 
-app = FastAPI(title="Auto Cloud Deploy - Terraform APIs")
+app = FastAPI(title="Auto Cloud Deploy - Terraform APIs", default_response_class=ORJSONResponse)
 
 
 class TerraformInput(BaseModel):
@@ -16,16 +14,15 @@ class TerraformInput(BaseModel):
 
 
 
-TF_CONVERTER_PATH = Path(__file__).resolve().parent.parent / "data-acquisition" / "tf_to_xml_converter.py"
-tf_converter = None
-if TF_CONVERTER_PATH.exists():
-    spec = importlib.util.spec_from_file_location("tf_to_xml_converter", str(TF_CONVERTER_PATH))
-    tf_mod = importlib.util.module_from_spec(spec)
-    try:
-        spec.loader.exec_module(tf_mod)
-        tf_converter = tf_mod
-    except Exception:
-        tf_converter = None
+# The converter (and its config/gemini_client imports) lives in data-acquisition,
+# which is put on sys.path so it loads as a normal module from its cached bytecode.
+DATA_ACQUISITION_DIR = Path(__file__).resolve().parent.parent / "data-acquisition"
+if str(DATA_ACQUISITION_DIR) not in sys.path:
+    sys.path.append(str(DATA_ACQUISITION_DIR))
+try:
+    import tf_to_xml_converter as tf_converter
+except Exception:
+    tf_converter = None
 
 
 @app.get("/health")
@@ -34,7 +31,7 @@ def health():
 
 
 @app.post("/terraform-to-xml")
-def terraform_to_xml(data: TerraformInput):
+async def terraform_to_xml(data: TerraformInput):
     """Convert Terraform HCL string to Draw.io XML using the existing converter module.
 
     Returns raw XML (Content-Type: application/xml) on success.
@@ -42,61 +39,46 @@ def terraform_to_xml(data: TerraformInput):
     if tf_converter is None or not hasattr(tf_converter, "generate_drawio_xml"):
         raise HTTPException(status_code=500, detail="Terraform->XML converter not available on server.")
 
-    xml = tf_converter.generate_drawio_xml(data.terraform)
+    # Returned as UTF-8 bytes, so the response body is used as-is instead of being encoded again.
+    xml = await tf_converter.generate_drawio_xml(data.terraform, as_bytes=True)
     if not xml:
         raise HTTPException(status_code=500, detail="Failed to generate XML. Check converter configuration (e.g. Gemini API key).")
 
     return Response(content=xml, media_type="application/xml")
 
 
+# Requests `docker exec` into this long-running container (see terraform_worker.py).
+TF_WORKER_NAME = "tf-worker-api-server"
+tf_worker = TerraformWorker(TF_WORKER_NAME)
+
+
+@app.on_event("startup")
+async def start_terraform_worker():
+    """Pull the Terraform image and start the shared worker container."""
+    await tf_worker.start()
+
+
+@app.on_event("shutdown")
+async def stop_terraform_worker():
+    await tf_worker.stop()
+
+
 @app.post("/run-terraform")
-def run_terraform(data: TerraformInput, timeout_seconds: Optional[int] = 120):
-    """Save incoming Terraform code to a temporary directory and run it inside a Dockerized Terraform image.
+async def run_terraform(data: TerraformInput, timeout_seconds: Optional[int] = 120):
+    """Save incoming Terraform code to a workspace in the worker container and run it inside a Dockerized Terraform image.
 
     Security notes:
     - Networking is disabled inside the container (`--net none`).
-    - CPU and memory are limited.
+    - CPU and memory are limited. The limits apply to the shared worker container as a whole:
+      concurrent requests share the 1 CPU / 512m budget, and a run that exhausts the memory
+      can get other requests' runs OOM-killed.
     - The container image used is `hashicorp/terraform:1.9.0`.
+    - Requests share one long-running container, each in its own `/workspace/<id>` directory
+      that is removed afterwards. A run that times out is killed together with its child processes.
 
     If Docker is not available or the command fails, the response will contain a `failed` status and `error` message.
     """
-    tmpdir = tempfile.mkdtemp()
-    tf_file = os.path.join(tmpdir, "main.tf")
-
-    try:
-        with open(tf_file, "w", encoding="utf-8") as f:
-            f.write(data.terraform)
-            
-        cmd = [
-            "docker", "run", "--rm",
-            "--net", "none",
-            "--cpus", "1", "--memory", "512m",
-            "-v", f"{tmpdir}:/workspace",
-            "-w", "/workspace",
-            "hashicorp/terraform:1.9.0",
-            "sh", "-c",
-            "terraform init -input=false && terraform apply -auto-approve"
-        ]
-
-        process = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout_seconds)
-
-        if process.returncode == 0:
-            return {"status": "success", "output": process.stdout.strip()}
-        else:
-            return {"status": "failed", "error": process.stderr.strip()}
-
-    except subprocess.TimeoutExpired:
-        return {"status": "failed", "error": "Terraform execution timed out"}
-
-    except FileNotFoundError as e:
-        # Docker binary not found on host
-        raise HTTPException(status_code=500, detail=f"Docker not found on server: {str(e)}")
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Execution error: {str(e)}")
-
-    finally:
-        shutil.rmtree(tmpdir, ignore_errors=True)
+    return await tf_worker.run(data.terraform, timeout_seconds)
 
 
 if __name__ == "__main__":
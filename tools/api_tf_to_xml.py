@@ -1,9 +1,10 @@
 from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from pathlib import Path
-import importlib.util
+import sys
 
-app = FastAPI(title="Auto Cloud Deploy - Terraform->XML API")
+app = FastAPI(title="Auto Cloud Deploy - Terraform->XML API", default_response_class=ORJSONResponse)
 
 
 class TerraformInput(BaseModel):
@@ -11,16 +12,15 @@ class TerraformInput(BaseModel):
 
 
 
-TF_CONVERTER_PATH = Path(__file__).resolve().parent.parent / "data-acquisition" / "tf_to_xml_converter.py"
-tf_converter = None
-if TF_CONVERTER_PATH.exists():
-    spec = importlib.util.spec_from_file_location("tf_to_xml_converter", str(TF_CONVERTER_PATH))
-    tf_mod = importlib.util.module_from_spec(spec)
-    try:
-        spec.loader.exec_module(tf_mod)
-        tf_converter = tf_mod
-    except Exception:
-        tf_converter = None
+# The converter (and its config/gemini_client imports) lives in data-acquisition,
+# which is put on sys.path so it loads as a normal module from its cached bytecode.
+DATA_ACQUISITION_DIR = Path(__file__).resolve().parent.parent / "data-acquisition"
+if str(DATA_ACQUISITION_DIR) not in sys.path:
+    sys.path.append(str(DATA_ACQUISITION_DIR))
+try:
+    import tf_to_xml_converter as tf_converter
+except Exception:
+    tf_converter = None
 
 
 @app.get("/health")
@@ -29,12 +29,13 @@ def health():
 
 
 @app.post("/terraform-to-xml")
-def terraform_to_xml(data: TerraformInput):
+async def terraform_to_xml(data: TerraformInput):
     """Convert Terraform HCL string to Draw.io XML using the existing converter module."""
     if tf_converter is None or not hasattr(tf_converter, "generate_drawio_xml"):
         raise HTTPException(status_code=500, detail="Terraform->XML converter not available on server.")
 
-    xml = tf_converter.generate_drawio_xml(data.terraform)
+    # Returned as UTF-8 bytes, so the response body is used as-is instead of being encoded again.
+    xml = await tf_converter.generate_drawio_xml(data.terraform, as_bytes=True)
     if not xml:
         raise HTTPException(status_code=500, detail="Failed to generate XML. Check converter configuration (e.g. Gemini API key).")
 
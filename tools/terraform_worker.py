@@ -0,0 +1,148 @@
+# terraform_worker.py
+"""
+Runs Terraform for the /run-terraform endpoints of api_server.py and
+api_run_terraform.py inside a long-running Docker container, so the image pull
+and container start-up are paid once at startup instead of on every request.
+"""
+import asyncio
+import uuid
+
+from fastapi import HTTPException
+
+TERRAFORM_IMAGE = "hashicorp/terraform:1.9.0"
+# Runs in the request's workspace. Terraform runs in its own process group
+# (setsid) in the background, so the shell sits in `wait`, where it can act on
+# SIGTERM (sent by `timeout`, or by TerraformWorker._stop() when the request is
+# abandoned): it then SIGKILLs that group, so terraform and its provider plugins
+# never outlive the request. The shell's PID is saved for _stop().
+TF_SCRIPT = (
+    "echo $$ > .tf.pid; "
+    "setsid sh -c 'terraform init -input=false && terraform apply -auto-approve' & "
+    "tf=$!; trap 'kill -KILL -$tf' TERM; wait $tf"
+)
+# Exit codes of a run stopped by `timeout`: its own, and the shell's after SIGTERM.
+# A SIGKILLed run (137) was OOM-killed or the container was removed, not timed out.
+TIMEOUT_EXIT_CODES = (124, 143)
+# Writes stdin to main.tf in the workspace given as $1.
+TF_WRITE_SCRIPT = 'mkdir -p "$1" && cat > "$1/main.tf"'
+
+
+async def _run(cmd, timeout=None, input=None):
+    """Runs a command without blocking the event loop, feeding it `input` (bytes) on stdin if given.
+    Returns (returncode, stdout, stderr)."""
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if input is not None else None,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(input), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise
+    return process.returncode, stdout.decode("utf-8", "replace"), stderr.decode("utf-8", "replace")
+
+
+class TerraformWorker:
+    """
+    A Docker container, named `name`, that Terraform requests `docker exec` into.
+    All requests share its 1 CPU and 512m of memory, so concurrent runs compete
+    for that budget and a run that exhausts the memory can get other requests'
+    runs OOM-killed. Each request works in its own /workspace/<id> directory.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    async def start(self):
+        """Pull the Terraform image and start the worker container."""
+        try:
+            await _run(["docker", "pull", TERRAFORM_IMAGE])
+            await _run(["docker", "rm", "-f", self.name])
+            returncode, _, stderr = await _run([
+                "docker", "run", "-d", "--name", self.name,
+                # PID 1 is `sleep`, which never reaps; --init adds a reaper for exited runs.
+                "--init",
+                "--net", "none",
+                "--cpus", "1", "--memory", "512m",
+                "-w", "/workspace",
+                # Workspaces, including each run's .terraform/ directory, live in RAM.
+                # tmpfs counts against the container's memory limit.
+                "--tmpfs", "/workspace:exec",
+                "--entrypoint", "sleep",
+                TERRAFORM_IMAGE, "infinity"
+            ])
+            if returncode != 0:
+                print(f"Could not start Terraform worker container: {stderr.strip()}")
+        except FileNotFoundError:
+            print("Docker not found on server; /run-terraform will fail until it is installed.")
+
+    async def stop(self):
+        """Remove the worker container."""
+        try:
+            await _run(["docker", "rm", "-f", self.name])
+        except FileNotFoundError:
+            pass
+
+    async def _stop(self, workspace):
+        """Kills a run that is still going in `workspace` (see TF_SCRIPT)."""
+        try:
+            await _run([
+                "docker", "exec", self.name, "sh", "-c",
+                'test -f "$1/.tf.pid" && kill -TERM "$(cat "$1/.tf.pid")"', "_", workspace
+            ])
+        except FileNotFoundError:
+            pass
+
+    async def run(self, terraform, timeout_seconds):
+        """
+        Runs `terraform init` and `terraform apply` on the given code in a fresh
+        workspace, for at most `timeout_seconds` (None for no limit). Returns the
+        /run-terraform response body.
+        """
+        # Each request gets its own directory inside the shared worker container.
+        workspace = f"/workspace/{uuid.uuid4().hex}"
+
+        try:
+            # Piped over stdin: `docker cp` cannot write into the worker's tmpfs.
+            returncode, _, stderr = await _run(
+                ["docker", "exec", "-i", self.name, "sh", "-c", TF_WRITE_SCRIPT, "_", workspace],
+                input=terraform.encode("utf-8")
+            )
+            if returncode != 0:
+                return {"status": "failed", "error": stderr.strip()}
+
+            cmd = ["docker", "exec", "-w", workspace, self.name]
+            exec_timeout = None
+            if timeout_seconds is not None:
+                # `timeout` runs inside the container: killing the local `docker exec`
+                # client alone would leave terraform running in the worker.
+                cmd += ["timeout", str(timeout_seconds)]
+                exec_timeout = timeout_seconds + 5
+            cmd += ["sh", "-c", TF_SCRIPT]
+            try:
+                returncode, stdout, stderr = await _run(cmd, timeout=exec_timeout)
+            except asyncio.TimeoutError:
+                await self._stop(workspace)
+                return {"status": "failed", "error": "Terraform execution timed out"}
+
+            if returncode == 0:
+                return {"status": "success", "output": stdout.strip()}
+            elif returncode in TIMEOUT_EXIT_CODES:
+                return {"status": "failed", "error": "Terraform execution timed out"}
+            else:
+                return {"status": "failed", "error": stderr.strip()}
+
+        except FileNotFoundError as e:
+            # Docker binary not found on host
+            raise HTTPException(status_code=500, detail=f"Docker not found on server: {str(e)}")
+
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Execution error: {str(e)}")
+
+        finally:
+            try:
+                await _run(["docker", "exec", self.name, "rm", "-rf", workspace])
+            except FileNotFoundError:
+                pass
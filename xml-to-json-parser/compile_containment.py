@@ -0,0 +1,41 @@
+# compile_containment.py
+"""
+Builds the containment kernel of xml_parser.py ahead of time with numba.pycc,
+so the parser can use a compiled kernel without Numba's per-process JIT
+warm-up (or without Numba installed at all; NumPy is still needed).
+
+Usage: python compile_containment.py [output_dir ...]
+
+The extension module is written to each output_dir, by default the directory
+of this script. xml_parser.py imports it when it sits next to the parser, so
+build it into tools/ as well for the copy the Java services run.
+"""
+import os
+import sys
+from numba.pycc import CC
+from _containment_jit import best_parent_kernel
+
+MODULE_NAME = "_containment_aot"
+
+
+def compile_module(output_dir):
+    """Compiles MODULE_NAME into output_dir."""
+    cc = CC(MODULE_NAME)
+    cc.output_dir = output_dir
+    cc.verbose = False
+    # Same source as the JIT kernel. Compiled ahead of time it runs on a
+    # single thread: prange() falls back to range() outside parallel=True.
+    cc.export("best_parents", "i8[:](f8[:], f8[:], f8[:], f8[:], f8[:])")(best_parent_kernel.py_func)
+    cc.compile()
+
+
+def main():
+    output_dirs = sys.argv[1:] or [os.path.dirname(os.path.abspath(__file__))]
+    for output_dir in output_dirs:
+        print(f"Compiling {MODULE_NAME} into {output_dir}...")
+        compile_module(output_dir)
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
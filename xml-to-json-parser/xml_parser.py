@@ -1,26 +1,221 @@
 # xml_parser_v3.py
-import xml.etree.ElementTree as ET
+import io
 import json
+import importlib.util
+import re
+from bisect import bisect_left
+from itertools import chain, islice
 import argparse
 import sys
+from dataclasses import dataclass
+
+try:
+    from lxml import etree as ET
+    # _make_parser() relies on resolve_entities="internal", added in lxml 5.
+    if ET.LXML_VERSION < (5, 0):
+        raise ImportError("lxml 5 or newer is required")
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAVE_LXML = False
+else:
+    HAVE_LXML = True
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The Numba kernel lives in _containment_jit and is imported on first use (see
+# _numba_kernel()), so small diagrams never pay for importing Numba.
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None
+_jit = None  # the _containment_jit module once imported
+
+try:
+    # The kernel compiled ahead of time by compile_containment.py, if it was built.
+    from _containment_aot import best_parents as _aot_best_parents
+except ImportError:
+    _aot_best_parents = None
+
+# Below this many vertices the pure-Python scan is fastest: building the arrays
+# for NumPy or Numba costs more than the whole scan.
+NUMPY_MIN_NODES = 24
+# Upper bound on containment matrix cells computed at once (bytes of memory per boolean temporary).
+NUMPY_BLOCK_CELLS = 1 << 22
+# The first Numba call has to compile (or load from cache) the kernel, so until
+# that has happened it is only used for diagrams big enough to make that back.
+NUMBA_MIN_NODES = 1000
+# NumPy and Numba still compare all pairs; past this size the quadtree can be faster.
+ALL_PAIRS_MAX_NODES = 10000
+# ... but only if the rectangles overlap little: the quadtree is used while the
+# average number of rectangles covering a point of the diagram is at most this.
+# Denser diagrams leave it with long candidate lists and stay on NumPy.
+QUADTREE_MAX_COVERAGE = 2.0
+# Without NumPy, the quadtree beats the sorted scan from about this many vertices.
+QUADTREE_MIN_NODES = 256
+# Quadtree cells holding at most this many rectangles are not split further.
+QUADTREE_LEAF_SIZE = 16
+QUADTREE_MAX_DEPTH = 12
+# Files are fed to the XML parser in pieces of this many bytes.
+READ_CHUNK_SIZE = 1 << 16
+# Line breaks in HTML labels, which Draw.io writes as <br>, <br/> or <br />.
+LABEL_BREAK_PATTERN = re.compile(r"<br\s*/?>")
+
+
+@dataclass
+class Node:
+    """
+    A vertex in the instruction tree. Slotted, since a diagram can have many
+    thousands; serializes to {"id", "label", "children"} (see dump_instruction()).
+    """
+    __slots__ = ("id", "label", "children")
+    id: str
+    label: str
+    children: list
+
+
+def _node_fields(node):
+    """json.dumps() default= hook for Node; orjson handles dataclasses natively."""
+    if isinstance(node, Node):
+        return {"id": node.id, "label": node.label, "children": node.children}
+    raise TypeError(f"Object of type {type(node).__name__} is not JSON serializable")
+
+
+def _read_chunks(xml_file_path):
+    """Yields the bytes of a file (a path or file object) in READ_CHUNK_SIZE pieces."""
+    if not hasattr(xml_file_path, "read"):
+        with open(xml_file_path, "rb") as f:
+            yield from iter(lambda: f.read(READ_CHUNK_SIZE), b"")
+        return
+    if isinstance(xml_file_path, io.TextIOBase):
+        # Text streams such as stdin are read through their byte buffer.
+        buffer = getattr(xml_file_path, "buffer", None)
+        if buffer is None:
+            yield xml_file_path.read().encode("utf-8")
+            return
+        xml_file_path = buffer
+    yield from iter(lambda: xml_file_path.read(READ_CHUNK_SIZE), b"")
+
+
+def _make_parser(target):
+    """An XMLParser that reports to `target` instead of building a tree."""
+    if HAVE_LXML:
+        # External entities are never loaded. Internal ones have to be expanded:
+        # without that, lxml passes attribute values to a target with "&" still
+        # escaped as "&#38;".
+        return ET.XMLParser(target=target, huge_tree=True, collect_ids=False, resolve_entities="internal")
+    return ET.XMLParser(target=target)
 
 
 def parse_geometry(cell):
     """Parses the mxGeometry element to get bounding box info."""
-    geo = cell.find("mxGeometry")
-    if geo is None:
+    # A plain scan of the children: lxml's find() goes through its Python-level
+    # ElementPath code and costs about twice as much per cell.
+    for geo in cell:
+        if geo.tag == "mxGeometry":
+            break
+    else:
         return None
+    return _geometry_from_attrs(geo.attrib)
+
+
+def _geometry_from_attrs(attrs):
+    """parse_geometry() for the attribute mapping of an mxGeometry element."""
     try:
         return {
-            "x": float(geo.get("x", 0)),
-            "y": float(geo.get("y", 0)),
-            "width": float(geo.get("width", 0)),
-            "height": float(geo.get("height", 0)),
+            "x": float(attrs.get("x", 0)),
+            "y": float(attrs.get("y", 0)),
+            "width": float(attrs.get("width", 0)),
+            "height": float(attrs.get("height", 0)),
         }
     except (ValueError, TypeError):
         return None
 
 
+class _DiagramTarget:
+    """
+    XMLParser target for build_instruction(). It reads the diagram name and
+    the mxCells directly under the first mxGraphModel/root straight from the
+    parser's start/end callbacks, so no Element objects are ever created.
+    """
+
+    def __init__(self):
+        self.diagram_name = "Untitled"
+        self.found_graph = False
+        self.nodes = {}
+        # Bounding boxes, kept out of the Nodes, which go straight into the output.
+        # Right/bottom edges and areas are computed once here rather than per pair.
+        self.bounds = {}
+        self.edge_endpoints = []
+        self._found_diagram = False
+        self._path = []  # tags of the currently open elements
+        self._graph_depth = None  # depth of the mxGraphModel/root element once found
+        self._in_graph = False
+        self._cell = None  # attributes of the open mxCell
+        self._geometry = None  # attributes of its first mxGeometry child
+
+    def start(self, tag, attrib):
+        path = self._path
+        depth = len(path)
+        if depth == 1 and tag == "diagram" and not self._found_diagram:
+            self._found_diagram = True
+            self.diagram_name = attrib.get("name", "Untitled")
+        elif self._graph_depth is None and depth >= 2 and tag == "root" and path[-1] == "mxGraphModel":
+            self._graph_depth = depth
+            self._in_graph = self.found_graph = True
+        elif self._in_graph:
+            if depth == self._graph_depth + 1:
+                if tag == "mxCell":
+                    self._cell = attrib
+                    self._geometry = None
+            elif (depth == self._graph_depth + 2 and tag == "mxGeometry" and
+                    self._cell is not None and self._geometry is None):
+                self._geometry = attrib
+        path.append(tag)
+
+    def end(self, tag):
+        path = self._path
+        path.pop()
+        if not self._in_graph:
+            return
+        depth = len(path)
+        if depth == self._graph_depth + 1:
+            if self._cell is not None:
+                self._add_cell(self._cell, self._geometry)
+                self._cell = None
+        elif depth == self._graph_depth:
+            self._in_graph = False
+
+    def _add_cell(self, attrs, geometry_attrs):
+        # Each cell is classified as vertex and/or edge in this one visit,
+        # reading every attribute at most once.
+        value = attrs.get("value")
+        # Vertices: extract geometry and value
+        if value and attrs.get("vertex") == "1":
+            node_id = attrs.get("id")
+            geometry = _geometry_from_attrs(geometry_attrs) if geometry_attrs is not None else None
+            if node_id and geometry:
+                label = value.strip()
+                # Most labels are plain text, so the regex only runs when needed.
+                if "<br" in label:
+                    label = LABEL_BREAK_PATTERN.sub(" ", label)
+                self.nodes[node_id] = Node(node_id, label, [])  # children are populated later
+                self.bounds[node_id] = geometry_bounds(geometry)
+        # Edges are resolved once every vertex is known. One missing an endpoint
+        # can never connect two vertices, so it isn't kept.
+        if attrs.get("edge") == "1":
+            source_id, target_id = attrs.get("source"), attrs.get("target")
+            if source_id is not None and target_id is not None:
+                self.edge_endpoints.append((source_id, target_id))
+
+    def close(self):
+        return self
+
+
 def is_contained(child_geo, parent_geo):
     """Checks if the child's geometry is contained within the parent's."""
     if not child_geo or not parent_geo:
@@ -33,94 +228,337 @@ def is_contained(child_geo, parent_geo):
     )
 
 
-def parse_drawio_xml_v3(xml_file_path):
+def geometry_bounds(geometry):
     """
-    Parses a Draw.io XML file and converts it into a hierarchical JSON object
-    by analyzing the geometry of the elements.
+    Returns the (x, y, right, bottom, area) tuple find_parents() works on for
+    a parse_geometry() dict. The area is used to find the tightest fitting parent.
     """
-    try:
-        tree = ET.parse(xml_file_path)
-        root = tree.getroot()
-    except (ET.ParseError, FileNotFoundError) as e:
-        print(f"Error reading or parsing XML file: {e}", file=sys.stderr)
-        return None
+    x, y = geometry["x"], geometry["y"]
+    width, height = geometry["width"], geometry["height"]
+    return (x, y, x + width, y + height, width * height)
 
-    graph_model_root = root.find(".//mxGraphModel/root")
-    if graph_model_root is None:
-        return None
 
-    nodes = {}
-    edges = []
+def _columns(bounds):
+    """Splits bounds tuples into parallel lists: xs, ys, x2s, y2s, areas."""
+    if not bounds:
+        return [], [], [], [], []
+    return tuple(map(list, zip(*bounds)))
 
-    # Pass 1: Extract all vertices with their geometry and value
-    for cell in graph_model_root.findall("mxCell"):
-        if cell.get("vertex") == "1" and cell.get("value"):
-            node_id = cell.get("id")
-            geometry = parse_geometry(cell)
-            if node_id and geometry:
-                nodes[node_id] = {
-                    "id": node_id,
-                    "label": cell.get("value", "").strip().replace("<br>", " "),
-                    "geometry": geometry,
-                    "children": []  # To be populated later
-                }
 
-    # Pass 2: Determine parent-child relationships based on geometry
-    all_node_ids = list(nodes.keys())
-    for child_id in all_node_ids:
-        potential_parents = []
-        for parent_id in all_node_ids:
-            if child_id == parent_id:
+def _parents_by_scan(bounds):
+    """Pure-Python find_parents(): scans candidate parents in ascending order of area."""
+    # Flattened into parallel lists up front, so the inner loop only compares
+    # local floats instead of indexing a tuple per coordinate.
+    xs, ys, x2s, y2s, areas = _columns(bounds)
+    # The first candidate that contains a child is its best parent. The sort is
+    # stable, so equal areas keep document order and ties go to the earlier node.
+    by_area = sorted(range(len(bounds)), key=areas.__getitem__)
+    sorted_areas = [areas[i] for i in by_area]
+    # A container is at least as wide and as tall as what it contains, so unless
+    # some size is negative it can't have a smaller area than its child.
+    no_negative_sizes = all(x2 >= x and y2 >= y for x, y, x2, y2 in zip(xs, ys, x2s, y2s))
+
+    position_of = [0] * len(by_area)
+    for position, i in enumerate(by_area):
+        position_of[i] = position
+
+    parents = []
+    for child in range(len(bounds)):
+        cx, cy, cx2, cy2 = xs[child], ys[child], x2s[child], y2s[child]
+        parent_index = -1
+        start = bisect_left(sorted_areas, areas[child]) if no_negative_sizes else 0
+        # The candidates before and after the child's own sorted position, so
+        # a node is never compared with itself.
+        own = position_of[child]
+        for i in chain(islice(by_area, start, own), islice(by_area, own + 1, None)):
+            if cx >= xs[i] and cy >= ys[i] and cx2 <= x2s[i] and cy2 <= y2s[i]:
+                parent_index = i
+                break
+        parents.append(parent_index)
+    return parents
+
+
+def _bounds_arrays(bounds):
+    """Splits bounds tuples into contiguous float64 arrays: xs, ys, x2s, y2s, areas."""
+    columns = np.array(bounds, dtype=np.float64).reshape(-1, 5).T
+    return tuple(np.ascontiguousarray(column) for column in columns)
+
+
+def _parents_numpy(bounds):
+    """NumPy find_parents(): tests a block of children against every node at once."""
+    xs, ys, x2s, y2s, areas = _bounds_arrays(bounds)
+
+    n = len(bounds)
+    parents = np.full(n, -1, dtype=np.intp)
+    # The containment matrix is built a block of rows at a time to bound memory.
+    block_size = max(1, NUMPY_BLOCK_CELLS // max(n, 1))
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        rows = np.arange(stop - start)
+        contained = (
+            (xs[start:stop, None] >= xs) &
+            (ys[start:stop, None] >= ys) &
+            (x2s[start:stop, None] <= x2s) &
+            (y2s[start:stop, None] <= y2s)
+        )
+        contained[rows, rows + start] = False  # a node is not its own parent
+        # argmin returns the first minimum, so ties go to the earlier node.
+        best = np.where(contained, areas, np.inf).argmin(axis=1)
+        parents[start:stop] = np.where(contained[rows, best], best, -1)
+    return parents.tolist()
+
+
+def _numba_kernel():
+    """
+    Returns the Numba kernel, importing it on first use (which compiles it, or
+    loads it from Numba's on-disk cache). None if it can't be imported.
+    """
+    global _jit, HAVE_NUMBA
+    if _jit is None and HAVE_NUMBA:
+        try:
+            import _containment_jit
+        except ImportError:
+            HAVE_NUMBA = False
+            return None
+        _jit = _containment_jit
+        # In a worker process (e.g. unify_dataset's pool, one worker per core)
+        # a kernel spread over all cores would oversubscribe the CPU.
+        import multiprocessing
+        if multiprocessing.parent_process() is not None:
+            import numba
+            numba.set_num_threads(1)
+    return _jit.best_parent_kernel if _jit is not None else None
+
+
+def _parents_numba(bounds):
+    """Numba find_parents(): the all-pairs comparison compiled and spread over all cores."""
+    kernel = _numba_kernel()
+    if kernel is None:
+        return _parents_numpy(bounds)
+    return kernel(*_bounds_arrays(bounds)).tolist()
+
+
+def _ready_kernel():
+    """
+    A compiled all-pairs kernel that can run without any warm-up: the Numba
+    kernel once it has been compiled or loaded in this process, else the
+    ahead-of-time compiled one. None if there is neither.
+    """
+    if _jit is not None and _jit.best_parent_kernel.signatures:
+        return _jit.best_parent_kernel
+    if np is not None:
+        return _aot_best_parents
+    return None
+
+
+def _parents_quadtree(bounds):
+    """
+    Quadtree find_parents() with linear memory, for diagrams too large for an
+    all-pairs comparison. Each rectangle is stored in the deepest cell that
+    fully contains it (or in a leaf bucket), so every container of a child is
+    stored in a cell on the path down to that child and only those cells are
+    searched.
+    """
+    if not bounds:
+        return []
+    xs, ys, x2s, y2s, areas = _columns(bounds)
+
+    min_x, min_y = min(xs), min(ys)
+    size = max(max(x2s) - min_x, max(y2s) - min_y) or 1.0
+    # Below this depth cells get too small to separate real diagram elements.
+    max_depth = min(QUADTREE_MAX_DEPTH, max(1, len(bounds).bit_length() // 2 + 1))
+
+    def midpoint(level, ix, iy):
+        half = size / (1 << (level + 1))
+        return min_x + (2 * ix + 1) * half, min_y + (2 * iy + 1) * half
+
+    # Build top-down: cell (level, ix, iy) -> indices stored there. Cells that
+    # were split into quadrants are recorded in `split`.
+    cells = {}
+    split = set()
+    stack = [((0, 0, 0), list(range(len(bounds))))]
+    while stack:
+        cell, items = stack.pop()
+        level, ix, iy = cell
+        if len(items) <= QUADTREE_LEAF_SIZE or level == max_depth:
+            cells[cell] = items
+            continue
+        split.add(cell)
+        mid_x, mid_y = midpoint(level, ix, iy)
+        stored = []
+        quadrants = {}
+        for i in items:
+            if x2s[i] <= mid_x:
+                qx = 0
+            elif xs[i] >= mid_x:
+                qx = 1
+            else:
+                stored.append(i)
+                continue
+            if y2s[i] <= mid_y:
+                qy = 0
+            elif ys[i] >= mid_y:
+                qy = 1
+            else:
+                stored.append(i)
                 continue
+            quadrants.setdefault((level + 1, 2 * ix + qx, 2 * iy + qy), []).append(i)
+        if stored:
+            cells[cell] = stored
+        stack.extend(quadrants.items())
 
-            if is_contained(nodes[child_id]["geometry"], nodes[parent_id]["geometry"]):
-                # The area is used to find the tightest fitting parent
-                parent_area = nodes[parent_id]["geometry"]["width"] * nodes[parent_id]["geometry"]["height"]
-                potential_parents.append((parent_id, parent_area))
+    parents = []
+    for child in range(len(bounds)):
+        cx, cy, cx2, cy2 = xs[child], ys[child], x2s[child], y2s[child]
+        best, best_area = -1, None
+        visit = [(0, 0, 0)]
+        while visit:
+            cell = visit.pop()
+            for i in cells.get(cell, ()):
+                if (i != child and cx >= xs[i] and cy >= ys[i] and cx2 <= x2s[i] and cy2 <= y2s[i] and
+                        (best < 0 or areas[i] < best_area or (areas[i] == best_area and i < best))):
+                    best, best_area = i, areas[i]
+            if cell in split:
+                level, ix, iy = cell
+                mid_x, mid_y = midpoint(level, ix, iy)
+                # A container went into a quadrant only if it fits there, and then so
+                # does the child. A child on a midline may fit in more than one.
+                for qx in ((0,) if cx2 <= mid_x else ()) + ((1,) if cx >= mid_x else ()):
+                    for qy in ((0,) if cy2 <= mid_y else ()) + ((1,) if cy >= mid_y else ()):
+                        visit.append((level + 1, 2 * ix + qx, 2 * iy + qy))
+        parents.append(best)
+    return parents
 
-        if potential_parents:
-            # The best parent is the one with the smallest area that contains the child
-            best_parent_id = min(potential_parents, key=lambda item: item[1])[0]
-            nodes[best_parent_id]["children"].append(nodes[child_id])
 
-    # Build the final hierarchical tree. The root elements are those that were not added as a child to any other node.
+def _coverage(bounds):
+    """Total area of the rectangles over the area of their bounding box."""
+    xs, ys, x2s, y2s, areas = _columns(bounds)
+    span = (max(x2s) - min(xs)) * (max(y2s) - min(ys))
+    total = sum(area for area in areas if area > 0)
+    return total / span if span > 0 else float("inf")
+
+
+def find_parents(bounds):
+    """
+    For each geometry_bounds() tuple, returns the index of its tightest fitting
+    container (the smallest-area one that contains it, ties going to the
+    earlier one), or -1 if nothing contains it.
+    """
+    n = len(bounds)
+    if n < NUMPY_MIN_NODES:
+        return _parents_by_scan(bounds)
+    if np is not None and (n < ALL_PAIRS_MAX_NODES or _coverage(bounds) > QUADTREE_MAX_COVERAGE):
+        if HAVE_NUMBA and n >= NUMBA_MIN_NODES:
+            return _parents_numba(bounds)
+        # A compiled kernel with no warm-up left to pay beats NumPy on smaller
+        # diagrams, so those use one if it is there.
+        kernel = _ready_kernel()
+        if kernel is not None:
+            return kernel(*_bounds_arrays(bounds)).tolist()
+        return _parents_numpy(bounds)
+    if n >= QUADTREE_MIN_NODES:
+        return _parents_quadtree(bounds)
+    return _parents_by_scan(bounds)
+
+
+def build_instruction(xml_file_path):
+    """
+    Parses a Draw.io XML file and converts it into a hierarchical instruction
+    dict by analyzing the geometry of the elements. Returns None on failure.
+    The "architecture" tree is made of Node objects; dump_instruction() turns
+    the dict into JSON.
+    """
+    # Single streaming pass straight from the parser callbacks (see
+    # _DiagramTarget), so the document is never held in memory.
+    target = _DiagramTarget()
+    parser = _make_parser(target)
+    try:
+        for chunk in _read_chunks(xml_file_path):
+            parser.feed(chunk)
+        parser.close()
+    except (ET.ParseError, OSError) as e:
+        print(f"Error reading or parsing XML file: {e}", file=sys.stderr)
+        return None
+
+    if not target.found_graph:
+        return None
+    nodes, bounds = target.nodes, target.bounds
+    diagram_name, edge_endpoints = target.diagram_name, target.edge_endpoints
+
+    # Pass 2: Determine parent-child relationships based on geometry
+    node_list = list(nodes.values())
+    parents = find_parents(list(bounds.values()))
     child_ids = set()
-    for node_data in nodes.values():
-        for child in node_data["children"]:
-            child_ids.add(child["id"])
+    for child, parent_index in zip(node_list, parents):
+        if parent_index >= 0:
+            node_list[parent_index].children.append(child)
+            child_ids.add(child.id)
 
+    # Build the final hierarchical tree. The root elements are those that were not added as a child to any other node.
     hierarchical_tree = [data for node_id, data in nodes.items() if node_id not in child_ids]
 
-    # Clean up geometry from final output as it's no longer needed
-    def clean_tree(node_list):
-        for node in node_list:
-            del node["geometry"]
-            if node["children"]:
-                clean_tree(node["children"])
-
-    clean_tree(hierarchical_tree)
-
-    # Pass 3: Extract edges (connections)
-    for cell in graph_model_root.findall("mxCell"):
-        if cell.get("edge") == "1":
-            source_id = cell.get("source")
-            target_id = cell.get("target")
-            if source_id in nodes and target_id in nodes:
-                edges.append({
-                    "source_id": source_id,
-                    "source_label": nodes[source_id]["label"],
-                    "target_id": target_id,
-                    "target_label": nodes[target_id]["label"],
-                })
+    # Pass 3: Connect the edges whose endpoints are both vertices. Each endpoint
+    # is looked up once; the lookup doubles as the membership test.
+    edges = [
+        {
+            "source_id": source_id,
+            "source_label": source.label,
+            "target_id": target_id,
+            "target_label": target.label,
+        }
+        for source_id, target_id in edge_endpoints
+        if (source := nodes.get(source_id)) is not None and (target := nodes.get(target_id)) is not None
+    ]
 
     output_schema = {
         "schema_version": "3.0",
-        "diagram_name": root.find("diagram").get("name", "Untitled"),
+        "diagram_name": diagram_name,
         "architecture": hierarchical_tree,
         "connections": edges
     }
 
-    return json.dumps(output_schema, indent=2)
+    return output_schema
+
+
+def dump_instruction(output_schema):
+    """
+    Serializes an instruction dict as indented JSON, returned as UTF-8 bytes.
+    Uses orjson when it is installed, which also writes non-ASCII labels as
+    UTF-8 instead of \\u escapes.
+    """
+    if orjson is not None:
+        return orjson.dumps(output_schema, option=orjson.OPT_INDENT_2)
+    return json.dumps(output_schema, indent=2, default=_node_fields).encode("utf-8")
+
+
+def parse_drawio_xml_v3(xml_file_path):
+    """
+    Parses a Draw.io XML file and converts it into a hierarchical JSON object
+    by analyzing the geometry of the elements.
+    """
+    output_schema = build_instruction(xml_file_path)
+    if output_schema is None:
+        return None
+    return dump_instruction(output_schema).decode("utf-8")
+
+
+def parse_file_to_json(xml_file_path, output_json_path):
+    """
+    Parses a Draw.io XML file and writes the JSON to output_json_path.
+    Returns the instruction dict, or None if nothing was written.
+    """
+    output_schema = build_instruction(xml_file_path)
+    if output_schema is None:
+        return None
+    if orjson is None:
+        # Streamed, so the JSON string is never built in memory.
+        with open(output_json_path, 'w', encoding='utf-8') as f:
+            json.dump(output_schema, f, indent=2, default=_node_fields)
+            f.write("\n")
+        return output_schema
+    with open(output_json_path, 'wb') as f:
+        f.write(dump_instruction(output_schema) + b"\n")
+    return output_schema
 
 
 def main():
@@ -128,11 +566,11 @@ def main():
     parser.add_argument("input_file", help="The path to the input Draw.io XML file.")
     args = parser.parse_args()
 
-    instruction_json = parse_drawio_xml_v3(args.input_file)
-    if instruction_json:
-        print(instruction_json)
-    else:
+    output_schema = build_instruction(args.input_file)
+    if output_schema is None:
         sys.exit(1)
+    # Written as bytes, so the output is UTF-8 whatever the console encoding is.
+    sys.stdout.buffer.write(dump_instruction(output_schema) + b"\n")
 
 
 if __name__ == "__main__":